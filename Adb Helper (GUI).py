@@ -6,6 +6,26 @@ import sys
 import shutil
 import threading
 import time # Added for screenshot filename
+import socket
+import struct
+import stat
+import posixpath
+import csv
+import collections
+import itertools
+import re
+import mmap
+import array
+import queue
+import hashlib
+import json
+import socketserver
+import zipfile
+import zlib
+import bisect
+import contextlib
+import concurrent.futures
+import ipaddress
 
 # --- Configuration ---
 WINDOW_TITLE = "ADB Helper GUI v1.1" # <<<--- SET TITLE AS REQUESTED
@@ -23,6 +43,8 @@ OK_COLOR = "#32CD32"   # LimeGreen
 WARN_COLOR = "#FFD700" # Gold
 ERROR_COLOR = "#FF4500" # OrangeRed
 EXEC_COLOR = "#6495ED" # CornflowerBlue
+# Caches, metrics and history; ADB_HELPER_DATA_DIR moves it (benchmarks use a temp dir)
+APP_DATA_DIR = os.environ.get("ADB_HELPER_DATA_DIR") or os.path.join(os.path.expanduser("~"), ".adb_helper")
 
 # --- Global Variables ---
 adb_executable_path = None
@@ -79,11 +101,13 @@ def find_adb_path():
 
 
 # --- Helper Functions ---
-def run_adb_command(args, display_output=True, command_name="Command", sync=False):
+def run_adb_command(args, display_output=True, command_name="Command", sync=False, priority=None):
     """
     Executes an ADB command and logs output.
     Can run asynchronously (default) or synchronously.
-    Returns Popen process object if async, or (stdout, stderr, returncode) if sync.
+    Async commands are queued on the command scheduler; `priority` overrides
+    the class picked by classify_command_priority().
+    Returns None if async, or (stdout, stderr, returncode) if sync.
     """
     global logcat_process, is_stopping_logcat
     if not adb_executable_path:
@@ -112,31 +136,69 @@ def run_adb_command(args, display_output=True, command_name="Command", sync=Fals
         use_shell_true = False
 
 
-    log_message(f"\n[EXEC] {' '.join(args)}", EXEC_COLOR) # Log the ADB part, not the wrapper
+    scope = (_split_device_args(args)[0], command_name) # Journal tags for everything this command logs
+    with journal_scope(*scope):
+        log_message(f"\n[EXEC] {' '.join(args)}", EXEC_COLOR) # Log the ADB part, not the wrapper
+
+    # Identical read-only commands share one adb process (and a short-lived cached result)
+    coalesce = is_read_only_command(args)
+    mutating = is_mutating_command(args)
+    if mutating:
+        invalidate_command_cache(args)
+
+    def execute_to_completion():
+        process = subprocess.Popen(
+            command,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            text=True,
+            creationflags=subprocess.CREATE_NO_WINDOW if sys.platform == "win32" else 0,
+            shell=use_shell_true
+        )
+        stdout_output, stderr_output = process.communicate()
+        return stdout_output, stderr_output, process.returncode
+
+    def execute_coalesced():
+        """Returns (stdout, stderr, returncode), sharing in-flight/cached results for read-only commands."""
+        if not coalesce:
+            return execute_to_completion()
+        result, source = run_single_flight(args, execute_to_completion)
+        if source == "cached":
+            log_message(f"[INFO] Using cached result (< {COMMAND_CACHE_TTL:g}s old).", INFO_COLOR)
+        elif source == "shared":
+            log_message("[INFO] Identical command already running, sharing its result.", INFO_COLOR)
+        return result
 
     def command_thread_target():
+        with journal_scope(*scope):
+            run_command_thread()
+
+    def run_command_thread():
         global logcat_process, is_stopping_logcat
+        # Special handling for streaming logcat
+        is_logcat_streaming = is_open_ended_command(args) and _split_device_args(args)[1][0] == 'logcat'
         try:
-            process = subprocess.Popen(
-                command, # Use modified command if needed
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                text=True,
-                creationflags=subprocess.CREATE_NO_WINDOW if sys.platform == "win32" else 0,
-                shell=use_shell_true # Set shell=True if using wrapper like cmd /c
-            )
-
-            # Special handling for streaming logcat
-            is_logcat_streaming = isinstance(args, list) and args and args[0] == 'logcat' and args[-1] != '-d'
             if is_logcat_streaming:
+                process = subprocess.Popen(
+                    command, # Use modified command if needed
+                    stdout=subprocess.PIPE,
+                    stderr=subprocess.PIPE,
+                    text=True,
+                    creationflags=subprocess.CREATE_NO_WINDOW if sys.platform == "win32" else 0,
+                    shell=use_shell_true # Set shell=True if using wrapper like cmd /c
+                )
                 logcat_process = process
                 is_stopping_logcat = False # Reset flag when starting
                 log_message(f"[ OK ] {command_name} started. Streaming... (Use 'Stop Logcat')", OK_COLOR)
+                logcat_device = _split_device_args(args)[0] or "(default)"
                 for line in iter(process.stdout.readline, ''):
                     if is_stopping_logcat or logcat_process != process: # Check flag or if process changed
                         log_message("[INFO] Logcat stream stopping...", INFO_COLOR)
                         break
-                    log_message(line.strip(), TEXT_AREA_FG)
+                    line = line.strip()
+                    log_message(line, TEXT_AREA_FG)
+                    crash_detector.feed(logcat_device, line)
+                crash_detector.flush(logcat_device)
 
                 process.stdout.close()
                 # Ensure termination if stop was requested
@@ -157,8 +219,7 @@ def run_adb_command(args, display_output=True, command_name="Command", sync=Fals
                     log_message(f"[STDERR]\n{stderr_output.strip()}", WARN_COLOR)
 
             else: # For non-streaming commands
-                stdout_output, stderr_output = process.communicate()
-                return_code = process.returncode
+                stdout_output, stderr_output, return_code = execute_coalesced()
 
                 if display_output and stdout_output:
                     log_message(f"[STDOUT]\n{stdout_output.strip()}")
@@ -183,55 +244,411 @@ def run_adb_command(args, display_output=True, command_name="Command", sync=Fals
             if 'process' in locals() and is_logcat_streaming and logcat_process == process:
                  logcat_process = None # Ensure it's cleared if thread ends unexpectedly
                  is_stopping_logcat = False
+            if mutating:
+                invalidate_command_cache(args) # Drop anything read while the change was in progress
             log_message("", tag_color=None) # Add a blank line
 
     # Decide whether to run synchronously or asynchronously
     if sync:
-        try:
-            # Use subprocess.run for synchronous execution
-            process = subprocess.run(
-                command, # Use potentially modified command
-                capture_output=True,
-                text=True,
-                creationflags=subprocess.CREATE_NO_WINDOW if sys.platform == "win32" else 0,
-                check=False, # Don't raise exception on non-zero exit code
-                shell=use_shell_true # Set shell=True if needed
-            )
-            stdout = process.stdout.strip() if process.stdout else ""
-            stderr = process.stderr.strip() if process.stderr else ""
-            retcode = process.returncode
-
-            # Log output even for sync commands
-            if stdout and display_output: log_message(f"[STDOUT]\n{stdout}")
-            if stderr: log_message(f"[STDERR]\n{stderr}", WARN_COLOR)
+        with journal_scope(*scope):
+            try:
+                # Run to completion on this thread (shared with identical in-flight commands)
+                stdout, stderr, retcode = execute_coalesced()
+                stdout = stdout.strip() if stdout else ""
+                stderr = stderr.strip() if stderr else ""
 
-            if retcode == 0:
-                 log_message(f"[ OK ] {command_name} executed successfully (sync).", OK_COLOR)
-            else:
-                 log_message(f"[FAIL] {command_name} exited with code: {retcode} (sync).", ERROR_COLOR)
-            log_message("", tag_color=None)
-            return stdout, stderr, retcode
+                # Log output even for sync commands
+                if stdout and display_output: log_message(f"[STDOUT]\n{stdout}")
+                if stderr: log_message(f"[STDERR]\n{stderr}", WARN_COLOR)
 
-        except FileNotFoundError:
-            cmd_str = command if isinstance(command, str) else command[0]
-            if use_shell_true and ("cmd" in cmd_str or "sh" in cmd_str):
-                 err_msg = f"Shell executable not found ({cmd_str})."
-            else:
-                 err_msg = f"ADB not found at {adb_executable_path}"
-            log_message(f"[ERROR] {err_msg}", ERROR_COLOR)
-            return "", err_msg, -1
-        except Exception as e:
-            log_message(f"[ERROR] Failed to execute sync ADB command: {e}", ERROR_COLOR)
-            return "", str(e), -1
-    else:
-        # Start the command execution in a separate thread for async
+                if retcode == 0:
+                     log_message(f"[ OK ] {command_name} executed successfully (sync).", OK_COLOR)
+                else:
+                     log_message(f"[FAIL] {command_name} exited with code: {retcode} (sync).", ERROR_COLOR)
+                log_message("", tag_color=None)
+                return stdout, stderr, retcode
+
+            except FileNotFoundError:
+                cmd_str = command if isinstance(command, str) else command[0]
+                if use_shell_true and ("cmd" in cmd_str or "sh" in cmd_str):
+                     err_msg = f"Shell executable not found ({cmd_str})."
+                else:
+                     err_msg = f"ADB not found at {adb_executable_path}"
+                log_message(f"[ERROR] {err_msg}", ERROR_COLOR)
+                return "", err_msg, -1
+            except Exception as e:
+                log_message(f"[ERROR] Failed to execute sync ADB command: {e}", ERROR_COLOR)
+                return "", str(e), -1
+            finally:
+                if mutating:
+                    invalidate_command_cache(args)
+    elif is_open_ended_command(args):
+        # Streaming logcat and a bare shell run until stopped, so they get their own thread instead of a worker
         thread = threading.Thread(target=command_thread_target, daemon=True)
         thread.start()
         return None # Indicate async start
+    else:
+        if priority is None:
+            priority = classify_command_priority(args)
+        command_scheduler.submit(command_thread_target, priority, _split_device_args(args)[0], ' '.join(args))
+        return None # Indicate async start
+
+
+# --- Command Coalescing & Result Cache ---
+COMMAND_CACHE_TTL = 2.0 # Seconds a read-only result can be reused
+
+# adb commands that only read state (anything after the command word is fine)
+READ_ONLY_ADB_COMMANDS = {"devices", "version", "get-serialno", "get-state", "get-devpath"}
+READ_ONLY_ADB_SUBCOMMANDS = {("forward", "--list"), ("reverse", "--list")}
+# `adb shell ...` commands that only read state, matched on their leading words
+READ_ONLY_SHELL_PREFIXES = (
+    ("getprop",), ("pm", "list"), ("pm", "path"), ("settings", "get"),
+    ("dumpsys",), ("cmd", "package", "list"),
+)
+READ_ONLY_SHELL_EXACT = {("wm", "size")} # "wm size 1080x1920" would change it
+# Commands whose completion makes cached reads stale
+MUTATING_ADB_COMMANDS = {
+    "install", "install-multiple", "uninstall", "push", "reboot", "root", "unroot", "remount",
+    "connect", "disconnect", "tcpip", "usb", "kill-server", "start-server", "sideload", "pair",
+    "forward", "reverse",
+}
+MUTATING_SHELL_PREFIXES = (
+    ("settings", "put"), ("settings", "delete"), ("pm", "clear"), ("pm", "enable"),
+    ("pm", "disable"), ("pm", "disable-user"), ("pm", "install"), ("pm", "uninstall"),
+    ("setprop",), ("reboot",), ("wm", "size"),
+)
+# Commands that change the adb server / connection set rather than one device
+SERVER_WIDE_ADB_COMMANDS = {"connect", "disconnect", "kill-server", "start-server", "pair"}
+
+command_cache = {} # (serial, args tuple) -> (stored_at, (stdout, stderr, returncode))
+inflight_commands = {} # (serial, args tuple) -> _InFlightCommand
+# Bumped by invalidate_command_cache(); a read only caches its result if no
+# invalidation happened while it ran. None is the server-wide generation.
+cache_generations = collections.Counter() # serial ("" = untargeted) / None -> generation
+command_cache_lock = threading.Lock()
+
+class _InFlightCommand:
+    """Result slot shared by every caller of the same running command."""
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+def _split_device_args(args):
+    """Splits a leading '-s SERIAL' off an adb argument list. Returns (serial or '', remaining args)."""
+    if len(args) >= 2 and args[0] == "-s":
+        return args[1], list(args[2:])
+    return "", list(args)
+
+def _shell_words(args):
+    if args and args[0] == "shell":
+        return tuple(args[1:])
+    return None
+
+def is_read_only_command(args):
+    """True for commands that are safe to coalesce and cache."""
+    _, args = _split_device_args(args)
+    if not args:
+        return False
+    words = _shell_words(args)
+    if words is None:
+        return args[0] in READ_ONLY_ADB_COMMANDS or tuple(args[:2]) in READ_ONLY_ADB_SUBCOMMANDS
+    if any(w in ("|", ">", "<", ";", "&&") for w in words):
+        return False # Pipelines could do anything
+    return words in READ_ONLY_SHELL_EXACT or any(words[:len(p)] == p for p in READ_ONLY_SHELL_PREFIXES)
+
+def is_mutating_command(args):
+    """True for commands that invalidate cached read-only results."""
+    _, args = _split_device_args(args)
+    if not args:
+        return False
+    words = _shell_words(args)
+    if words is None:
+        return args[0] in MUTATING_ADB_COMMANDS and tuple(args[:2]) not in READ_ONLY_ADB_SUBCOMMANDS
+    if words in READ_ONLY_SHELL_EXACT:
+        return False
+    return any(words[:len(p)] == p for p in MUTATING_SHELL_PREFIXES)
+
+def invalidate_command_cache(args=None):
+    """
+    Drops cached results made stale by `args` (a mutating command): everything
+    for server-wide or untargeted commands, otherwise just that device's entries.
+    """
+    serial, args = _split_device_args(args or [])
+    with command_cache_lock:
+        if not serial or not args or args[0] in SERVER_WIDE_ADB_COMMANDS:
+            affected = lambda key: True
+            cache_generations[None] += 1
+        else:
+            # Untargeted entries ("") may have run on this same device
+            affected = lambda key: key[0] in (serial, "")
+            cache_generations[serial] += 1
+            cache_generations[""] += 1
+        for key in [k for k in command_cache if affected(k)]:
+            del command_cache[key]
+        # Reads already running started before the change; later callers must not join them
+        for key in [k for k in inflight_commands if affected(k)]:
+            del inflight_commands[key]
+    if args and args[0] == "push":
+        if serial: invalidate_browser_cache(serial)
+        else: file_browser_cache.clear()
+
+def run_single_flight(args, execute):
+    """
+    Runs `execute()` once for any number of concurrent callers with the same args.
+    Returns (result, source) where source is "executed", "shared" or "cached".
+    """
+    serial, rest = _split_device_args(args)
+    key = (serial, tuple(rest))
+    with command_cache_lock:
+        cached = command_cache.get(key)
+        if cached and time.monotonic() - cached[0] < COMMAND_CACHE_TTL:
+            return cached[1], "cached"
+        flight = inflight_commands.get(key)
+        is_leader = flight is None
+        if is_leader:
+            flight = inflight_commands[key] = _InFlightCommand()
+            generation = (cache_generations[None], cache_generations[serial])
+
+    if not is_leader:
+        flight.done.wait()
+        if flight.error is not None:
+            raise flight.error
+        return flight.result, "shared"
+
+    try:
+        flight.result = execute()
+        return flight.result, "executed"
+    except Exception as e:
+        flight.error = e
+        raise
+    finally:
+        with command_cache_lock:
+            if inflight_commands.get(key) is flight:
+                del inflight_commands[key]
+            unchanged = generation == (cache_generations[None], cache_generations[serial])
+            if unchanged and flight.result is not None and flight.result[2] == 0:
+                command_cache[key] = (time.monotonic(), flight.result)
+        flight.done.set()
+
+# --- Command Scheduler ---
+# Async commands run on a small worker pool instead of one thread each.
+# Jobs are queued per device and per priority class so a quick getprop
+# isn't stuck behind a large push/install on the same link.
+PRIORITY_INTERACTIVE = 0 # Quick reads the user is waiting on
+PRIORITY_NORMAL = 1
+PRIORITY_BULK = 2 # Transfers and installs
+PRIORITY_NAMES = {PRIORITY_INTERACTIVE: "Interactive", PRIORITY_NORMAL: "Normal", PRIORITY_BULK: "Bulk"}
+SCHEDULER_WORKERS = 4
+BULK_MAX_RUNNING = 2 # Leaves workers free for interactive/normal jobs
+BULK_ADB_COMMANDS = {"push", "pull", "install", "install-multiple", "sideload", "backup", "restore"}
+
+class ScheduledJob:
+    """One queued unit of work."""
+    _ids = itertools.count(1)
+
+    def __init__(self, func, priority, device, label):
+        self.id = next(self._ids)
+        self.func = func
+        self.priority = priority
+        self.device = device
+        self.label = label
+        self.state = "Queued"
+        self.enqueued_at = time.monotonic()
+        self.started_at = None
+
+class CommandScheduler:
+    """
+    Priority-aware worker pool. Highest priority wins; within a priority,
+    devices are served round-robin so one busy device can't starve others.
+    At most one bulk job runs per device, and bulk work can be paused.
+    """
+
+    def __init__(self, workers=SCHEDULER_WORKERS):
+        self.workers = workers
+        self.cond = threading.Condition()
+        self.queues = {} # device -> {priority: deque of jobs}
+        self.device_order = collections.deque() # Round-robin order of devices
+        self.running = {} # job id -> job
+        self.bulk_devices = set() # Devices with a bulk job running
+        self.bulk_paused = False
+        self.threads = []
+
+    def _ensure_workers(self):
+        while len(self.threads) < self.workers:
+            thread = threading.Thread(target=self._worker_loop, daemon=True)
+            self.threads.append(thread)
+            thread.start()
+
+    def submit(self, func, priority=PRIORITY_NORMAL, device="", label="Job"):
+        """Queues `func()` and returns its ScheduledJob."""
+        job = ScheduledJob(func, priority, device, label)
+        with self.cond:
+            if device not in self.queues:
+                self.queues[device] = {p: collections.deque() for p in PRIORITY_NAMES}
+                self.device_order.append(device)
+            self.queues[device][priority].append(job)
+            self._ensure_workers()
+            self.cond.notify()
+        return job
+
+    def _next_job(self):
+        """Picks the next runnable job. Caller holds the lock."""
+        bulk_running = sum(1 for job in self.running.values() if job.priority == PRIORITY_BULK)
+        other_running = sum(1 for job in self.running.values() if job.priority != PRIORITY_INTERACTIVE)
+        bulk_limit = max(1, min(BULK_MAX_RUNNING, self.workers - 1)) # Always keep a worker for quick jobs
+        for priority in sorted(PRIORITY_NAMES):
+            if priority != PRIORITY_INTERACTIVE and self.workers > 1 and other_running >= self.workers - 1:
+                continue # One worker is reserved for interactive jobs
+            if priority == PRIORITY_BULK and (self.bulk_paused or bulk_running >= bulk_limit):
+                continue
+            for _ in range(len(self.device_order)):
+                device = self.device_order[0]
+                self.device_order.rotate(-1)
+                queue = self.queues[device][priority]
+                if queue and not (priority == PRIORITY_BULK and device in self.bulk_devices):
+                    job = queue.popleft()
+                    self._drop_if_drained(device)
+                    return job
+        return None
+
+    def _drop_if_drained(self, device):
+        """Forgets a device with nothing queued, so the round-robin only walks busy devices. Caller holds the lock."""
+        if not any(self.queues[device].values()):
+            del self.queues[device]
+            self.device_order.remove(device)
+
+    def _worker_loop(self):
+        while True:
+            with self.cond:
+                job = self._next_job()
+                while job is None:
+                    self.cond.wait()
+                    job = self._next_job()
+                job.state = "Running"
+                job.started_at = time.monotonic()
+                self.running[job.id] = job
+                if job.priority == PRIORITY_BULK:
+                    self.bulk_devices.add(job.device)
+            try:
+                job.func()
+            except Exception as e:
+                log_message(f"[ERROR] Scheduled job '{job.label}' failed: {e}", ERROR_COLOR)
+            finally:
+                with self.cond:
+                    job.state = "Done"
+                    self.running.pop(job.id, None)
+                    if job.priority == PRIORITY_BULK:
+                        self.bulk_devices.discard(job.device)
+                    self.cond.notify_all()
+
+    def set_bulk_paused(self, paused):
+        """Pausing keeps queued bulk jobs waiting; running ones finish normally."""
+        with self.cond:
+            self.bulk_paused = paused
+            self.cond.notify_all()
+
+    def cancel(self, job_ids=None, priority=None):
+        """Removes queued jobs (by id, or every job of a priority). Returns the cancelled jobs."""
+        cancelled = []
+        with self.cond:
+            for device_queues in self.queues.values():
+                for p, queue in device_queues.items():
+                    keep = collections.deque()
+                    for job in queue:
+                        if (job_ids is not None and job.id in job_ids) or (priority is not None and p == priority):
+                            job.state = "Cancelled"
+                            cancelled.append(job)
+                        else:
+                            keep.append(job)
+                    device_queues[p] = keep
+            for device in list(self.queues):
+                self._drop_if_drained(device)
+        return cancelled
+
+    def snapshot(self):
+        """Returns running jobs followed by queued jobs, for display."""
+        with self.cond:
+            queued = [job for device_queues in self.queues.values() for queue in device_queues.values() for job in queue]
+            return list(self.running.values()) + sorted(queued, key=lambda j: (j.priority, j.id))
+
+command_scheduler = CommandScheduler()
+
+def is_open_ended_command(args):
+    """True for commands that never finish on their own (streaming logcat, a bare `adb shell`)."""
+    _, rest = _split_device_args(args)
+    return rest == ["shell"] or bool(rest and rest[0] == "logcat" and rest[-1] != "-d")
+
+def classify_command_priority(args):
+    """Default priority class for an adb argument list."""
+    _, rest = _split_device_args(args)
+    if rest and rest[0] in BULK_ADB_COMMANDS:
+        return PRIORITY_BULK
+    if is_read_only_command(args):
+        return PRIORITY_INTERACTIVE
+    return PRIORITY_NORMAL
+
+def open_job_queue():
+    """Shows queued/running jobs and lets the user pause or cancel queued bulk work."""
+    window = tk.Toplevel(root)
+    window.title("Job Queue")
+    window.geometry("620x360")
+    window.config(bg=DEFAULT_BACKGROUND_COLOR)
+
+    tree = ttk.Treeview(window, columns=("priority", "device", "state", "waited"), selectmode="extended")
+    tree.heading("#0", text="Job")
+    tree.heading("priority", text="Priority")
+    tree.heading("device", text="Device")
+    tree.heading("state", text="State")
+    tree.heading("waited", text="Waited")
+    tree.column("#0", width=260)
+    tree.column("priority", width=80)
+    tree.column("device", width=110)
+    tree.column("state", width=70)
+    tree.column("waited", width=70, anchor="e")
+    tree.pack(expand=True, fill=tk.BOTH, padx=5, pady=5)
+
+    def refresh():
+        if not tree.winfo_exists(): return
+        jobs = command_scheduler.snapshot()
+        now = time.monotonic()
+        wanted = {str(job.id) for job in jobs}
+        for item in tree.get_children():
+            if item not in wanted: tree.delete(item)
+        for job in jobs:
+            waited = (job.started_at or now) - job.enqueued_at
+            values = (PRIORITY_NAMES[job.priority], job.device or "(default)", job.state, f"{waited:.1f}s")
+            if tree.exists(str(job.id)):
+                tree.item(str(job.id), values=values)
+            else:
+                tree.insert("", tk.END, iid=str(job.id), text=job.label, values=values)
+        pause_button.configure(text="Resume Bulk" if command_scheduler.bulk_paused else "Pause Bulk")
+        window.after(500, refresh)
+
+    def toggle_pause():
+        paused = not command_scheduler.bulk_paused
+        command_scheduler.set_bulk_paused(paused)
+        log_message(f"[INFO] Bulk jobs {'paused' if paused else 'resumed'}.", INFO_COLOR)
+
+    def report(cancelled):
+        for job in cancelled:
+            log_message(f"[INFO] Cancelled queued job: {job.label}", INFO_COLOR)
+
+    button_bar = ttk.Frame(window, padding="5", style="TFrame")
+    button_bar.pack(fill=tk.X)
+    pause_button = ttk.Button(button_bar, text="Pause Bulk", command=toggle_pause, width=13)
+    pause_button.pack(side=tk.LEFT, padx=2)
+    ttk.Button(button_bar, text="Cancel Selected", width=15,
+               command=lambda: report(command_scheduler.cancel(job_ids={int(i) for i in tree.selection()}))).pack(side=tk.LEFT, padx=2)
+    ttk.Button(button_bar, text="Cancel All Bulk", width=15,
+               command=lambda: report(command_scheduler.cancel(priority=PRIORITY_BULK))).pack(side=tk.LEFT, padx=2)
+    refresh()
 
 
 def log_message(message, tag_color=None):
     """Appends a message to the text area, applying color if specified."""
+    if session_journal:
+        session_journal.record(message, tag_color) # Kept even after Clear Output
     try:
         if not root.winfo_exists(): return # Prevent errors during shutdown
 
@@ -372,7 +789,26 @@ def pull_file():
 def install_apk():
     apk_path = filedialog.askopenfilename(title="Select APK File to Install", filetypes=[("APK files", "*.apk")])
     if not apk_path: return
-    run_adb_command(["install", "-r", apk_path], command_name="Install APK") # Added -r to allow reinstall/update
+    command_scheduler.submit(lambda: _thread_install_apk(apk_path), PRIORITY_BULK, label=f"Install {os.path.basename(apk_path)}")
+
+def _thread_install_apk(apk_path):
+    """Reads the APK's metadata, skips the install if the device already has the identical APK."""
+    try:
+        info = get_apk_info(apk_path)
+    except (ApkParseError, OSError) as e:
+        log_message(f"[WARN] Could not read APK metadata ({e}). Installing anyway.", WARN_COLOR)
+        info = None
+    if info and info["package"]:
+        log_message(f"[INFO] {describe_apk(info)}", INFO_COLOR)
+        def fill_package_name():
+            package_name_entry.delete(0, tk.END)
+            package_name_entry.insert(0, info["package"])
+        root.after(0, fill_package_name)
+        if is_apk_installed_identical(info["package"], info["sha256"]):
+            log_message(f"[ OK ] {info['package']} is already installed with identical content. Skipping install.", OK_COLOR)
+            log_message("", tag_color=None)
+            return
+    run_adb_command(["install", "-r", apk_path], command_name="Install APK", sync=True) # Added -r to allow reinstall/update
 
 def uninstall_apk():
     package_name = package_name_entry.get()
@@ -426,12 +862,13 @@ def clear_app_data():
     else:
         log_message("[INFO] Clear data cancelled by user.", INFO_COLOR)
 
-def force_stop_app():
+def force_stop_app(serial=None):
     package_name = package_name_entry.get()
     if not package_name:
         log_message("[WARN] Please enter the package name to force stop.", WARN_COLOR)
         return
-    run_adb_command(["shell", "am", "force-stop", package_name], command_name=f"Force Stop {package_name}")
+    device = ["-s", serial] if serial else [] # Process Viewer targets a specific device
+    run_adb_command(device + ["shell", "am", "force-stop", package_name], command_name=f"Force Stop {package_name}")
 
 
 def toggle_app(enable=True):
@@ -573,9 +1010,8 @@ def take_screenshot():
         log_message("[INFO] Screenshot cancelled.", INFO_COLOR)
         return
 
-    # Use a dedicated thread for the sequence: screencap -> pull -> rm
-    thread = threading.Thread(target=_thread_take_screenshot, args=(local_save_path,), daemon=True)
-    thread.start()
+    # Queue the whole sequence as one job: screencap -> pull -> rm
+    command_scheduler.submit(lambda: _thread_take_screenshot(local_save_path), PRIORITY_NORMAL, label="Screenshot")
 
 def _thread_take_screenshot(local_save_path):
     """Worker thread for taking screenshot (runs commands synchronously)."""
@@ -694,30 +1130,37 @@ Category        Command        Description
                 Version        Show ADB's Version
                 ADB Root       Restart ADB daemon with root permissions
                 Remount Sys    Remount System Partition as R/W (requires root)
+                Port Forwards  Manage adb forward/reverse rules (kept across reconnects), link speed test
+                Wireless Scan  Find Android 11+ wireless debugging devices (mDNS), pair & connect all at once
 
 **Device Interaction**
                 Start Shell    Start ADB shell in a new console window
                 Screenshot     Take screenshot and save to PC
+                Screen Record  Record device(s) as H.264 straight to PC, no length limit
                 Reboot         Reboot Device (Normal)
                 Reboot BL      Reboot into Bootloader
                 Reboot Rec     Reboot into Recovery
                 Reboot FB      Reboot into Fastbootd (Userspace Fastboot)
                 Wake/Sleep     Simulate Power Button press (toggle screen on/off)
+                Reboot Manager Reboot many devices in parallel, time adb + boot completion
 
 **File Management**
                 Push File      Push File (PC -> Device) - Select PC file, enter Device path
                 Pull File      Pull File (Device -> PC) - Enter Device file path, select PC folder
+                File Browser   Browse device folders (expand to list), multi-select push/pull
 
 **Application Management (Requires Package Name)**
                 List Pkgs      List Installed Packages
                 List Pkgs Path List Packages with File Locations
                 List Pkgs 3rd  List only Third-Party Packages
-                Install APK    Install APK - Select APK file (-r flag included)
+                Install APK    Install APK - Select APK file (-r flag included), skipped if identical one installed
+                Scan APKs      Show package/version/SDK/ABI/signer of every APK in a PC folder
                 Uninstall APK  Uninstall APK
                 Disable App    Disable App for current user (pm disable-user)
                 Enable App     Enable a previously disabled App (pm enable)
                 Clear Data     Clear App Data (Confirmation required)
                 Force Stop     Force Stop App (am force-stop)
+                Processes      Live per-device process table (CPU %, RSS), kill or force stop
 
 **Device Properties**
                 Get Brightness Get current screen brightness (0-255)
@@ -735,9 +1178,13 @@ Category        Command        Description
 **Debugging & Logging**
                 Start Logcat   Output device Logcat (streamed below, -v brief)
                 Stop Logcat    Stops the Logcat stream
+                Log Viewer     Open a saved logcat/dump file of any size (search, jump to time)
+                Crash Report   Crashes/ANRs/tombstones detected in Logcat, grouped and counted
 
 **GUI Controls**
-                Clear Output   Clear this output text area
+                Job Queue      Show queued/running commands, pause or cancel bulk transfers
+                Clear Output   Clear this output text area (the session journal keeps it)
+                Journal        Reopen past session output (~/.adb_helper/journal), seek by time/command
                 Help           Show this help menu
 _______________________________________
 [!] = Note potential permission requirements or specific behavior.
@@ -745,6 +1192,3064 @@ _______________________________________
     log_message(help_text, INFO_COLOR) # Use log_message to display help in the text area
 
 
+# --- ADB Server Protocol ---
+# Talks to the local adb server directly over its "smart socket" (the same
+# protocol the adb client uses), so features like the file browser don't
+# have to spawn an adb process and parse text output for every request.
+ADB_SERVER_HOST = "127.0.0.1"
+ADB_SERVER_PORT = int(os.getenv("ANDROID_ADB_SERVER_PORT", "5037"))
+ADB_SERVER_TIMEOUT = 10 # Seconds
+
+class AdbServerError(Exception):
+    """Raised when the adb server answers FAIL or the connection breaks."""
+
+def _adb_recv_exact(sock, size):
+    """Reads exactly `size` bytes from the socket or raises AdbServerError."""
+    data = bytearray()
+    while len(data) < size:
+        chunk = sock.recv(size - len(data))
+        if not chunk:
+            raise AdbServerError("Connection closed by adb server.")
+        data.extend(chunk)
+    return bytes(data)
+
+def _adb_read_status(sock):
+    """Reads an OKAY/FAIL status. Raises AdbServerError with the server's message on FAIL."""
+    status = _adb_recv_exact(sock, 4)
+    if status == b"OKAY":
+        return
+    if status == b"FAIL":
+        length = int(_adb_recv_exact(sock, 4), 16)
+        raise AdbServerError(_adb_recv_exact(sock, length).decode("utf-8", "replace"))
+    raise AdbServerError(f"Unexpected adb server response: {status!r}")
+
+def _adb_send_request(sock, request):
+    """Sends a hex-length-prefixed request and waits for OKAY."""
+    payload = request.encode("utf-8")
+    sock.sendall(f"{len(payload):04x}".encode("ascii") + payload)
+    _adb_read_status(sock)
+
+def adb_server_connect(service, serial=None, timeout=ADB_SERVER_TIMEOUT, autostart=True):
+    """
+    Opens a socket to the adb server and starts `service` on it.
+    Non-"host" services are routed to `serial` (or any single device if None).
+    Starts the adb server once if it isn't running yet, unless `autostart` is False
+    (background watchers must not undo Kill Server).
+    """
+    try:
+        sock = socket.create_connection((ADB_SERVER_HOST, ADB_SERVER_PORT), timeout=timeout)
+    except ConnectionRefusedError:
+        if not autostart:
+            raise
+        if not adb_executable_path:
+            raise AdbServerError("ADB server is not running and ADB path is not set.")
+        subprocess.run(
+            [adb_executable_path, "start-server"],
+            capture_output=True,
+            creationflags=subprocess.CREATE_NO_WINDOW if sys.platform == "win32" else 0,
+        )
+        sock = socket.create_connection((ADB_SERVER_HOST, ADB_SERVER_PORT), timeout=timeout)
+    try:
+        if not service.startswith("host"):
+            _adb_send_request(sock, f"host:transport:{serial}" if serial else "host:transport-any")
+        _adb_send_request(sock, service)
+    except Exception:
+        sock.close()
+        raise
+    return sock
+
+def adb_server_query(request, serial=None):
+    """Runs a host request that answers with a single length-prefixed payload (e.g. host:devices)."""
+    if serial and request.startswith("host:"):
+        request = f"host-serial:{serial}:{request[5:]}"
+    sock = adb_server_connect(request)
+    try:
+        length = int(_adb_recv_exact(sock, 4), 16)
+        return _adb_recv_exact(sock, length).decode("utf-8", "replace")
+    finally:
+        sock.close()
+
+def adb_server_read_all(sock):
+    """Reads a service's output until the device side closes the stream."""
+    chunks = []
+    while True:
+        chunk = sock.recv(65536)
+        if not chunk:
+            return b"".join(chunks)
+        chunks.append(chunk)
+
+def track_devices(timeout=None, autostart=True):
+    """
+    Yields {serial: state} every time the adb server reports a device change
+    (host:track-devices), starting with the current list. Raises socket.timeout
+    if nothing changes within `timeout` seconds.
+    """
+    sock = adb_server_connect("host:track-devices", autostart=autostart)
+    sock.settimeout(timeout)
+    try:
+        while True:
+            length = int(_adb_recv_exact(sock, 4), 16)
+            payload = _adb_recv_exact(sock, length).decode("utf-8", "replace")
+            yield dict(line.split("\t", 1) for line in payload.splitlines() if "\t" in line)
+    finally:
+        sock.close()
+
+def list_device_serials(include_offline=False):
+    """Returns [(serial, state), ...] from the adb server (no adb process spawned)."""
+    devices = []
+    for line in adb_server_query("host:devices").splitlines():
+        parts = line.split("\t")
+        if len(parts) == 2 and (include_offline or parts[1] == "device"):
+            devices.append((parts[0], parts[1]))
+    return devices
+
+def with_connected_devices(open_window, allow_empty=False):
+    """
+    Queries connected devices off the Tk thread (the server may need starting)
+    and then calls open_window(serials) on the Tk thread. Logs and stops if
+    the server can't be reached, or if no device is connected and not `allow_empty`.
+    """
+    def query():
+        try:
+            devices = [serial for serial, _ in list_device_serials()]
+        except (AdbServerError, OSError) as e:
+            log_message(f"[ERROR] Could not query devices from the adb server: {e}", ERROR_COLOR)
+            return
+        if not devices and not allow_empty:
+            log_message("[WARN] No device connected. Connect a device and try again.", WARN_COLOR)
+            return
+        root.after(0, lambda: open_window(devices))
+    command_scheduler.submit(query, PRIORITY_INTERACTIVE, label="List devices")
+
+
+# --- Sync Protocol (LIST / STAT / RECV / SEND) ---
+SYNC_DATA_MAX = 64 * 1024 # Max payload of a single DATA packet
+
+class SyncSession:
+    """
+    One "sync:" session on a device. Directory listings, stats and any number
+    of file transfers reuse the same connection, which is much cheaper than
+    one `adb push`/`adb pull` process per file.
+    Use as a context manager: `with SyncSession(serial) as sync: ...`
+    """
+
+    def __init__(self, serial=None):
+        self.serial = serial
+        self.sock = adb_server_connect("sync:", serial)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        if self.sock is None: return
+        try:
+            self.sock.sendall(b"QUIT" + struct.pack("<I", 0))
+        except OSError:
+            pass # Connection may already be gone
+        self.sock.close()
+        self.sock = None
+
+    def _send(self, sync_id, payload=b""):
+        self.sock.sendall(sync_id + struct.pack("<I", len(payload)) + payload)
+
+    def _read_fail(self, length):
+        message = _adb_recv_exact(self.sock, length).decode("utf-8", "replace")
+        raise AdbServerError(message)
+
+    def list_dir(self, path):
+        """Yields (name, mode, size, mtime) for each entry of a device directory."""
+        self._send(b"LIST", path.encode("utf-8"))
+        while True:
+            header = _adb_recv_exact(self.sock, 20)
+            sync_id = header[:4]
+            mode, size, mtime, name_len = struct.unpack("<IIII", header[4:])
+            if sync_id == b"DONE":
+                return
+            if sync_id == b"FAIL":
+                # FAIL carries its length in the first field
+                self._read_fail(mode)
+            if sync_id != b"DENT":
+                raise AdbServerError(f"Unexpected sync response: {sync_id!r}")
+            name = _adb_recv_exact(self.sock, name_len).decode("utf-8", "replace")
+            if name not in (".", ".."):
+                yield name, mode, size, mtime
+
+    def stat(self, path):
+        """Returns (mode, size, mtime) of a device path. mode == 0 means it doesn't exist."""
+        self._send(b"STAT", path.encode("utf-8"))
+        response = _adb_recv_exact(self.sock, 16)
+        if response[:4] != b"STAT":
+            raise AdbServerError(f"Unexpected sync response: {response[:4]!r}")
+        return struct.unpack("<III", response[4:])
+
+    def pull(self, remote_path, local_path):
+        """Copies one device file to `local_path`. Returns the number of bytes received."""
+        self._send(b"RECV", remote_path.encode("utf-8"))
+        received = 0
+        with open(local_path, "wb") as local_file:
+            while True:
+                header = _adb_recv_exact(self.sock, 8)
+                sync_id, length = header[:4], struct.unpack("<I", header[4:])[0]
+                if sync_id == b"DONE":
+                    return received
+                if sync_id == b"FAIL":
+                    self._read_fail(length)
+                if sync_id != b"DATA":
+                    raise AdbServerError(f"Unexpected sync response: {sync_id!r}")
+                local_file.write(_adb_recv_exact(self.sock, length))
+                received += length
+
+    def push(self, local_path, remote_path, mode=0o644):
+        """Copies one local file to `remote_path` on the device. Returns the number of bytes sent."""
+        self._send(b"SEND", f"{remote_path},{mode}".encode("utf-8"))
+        sent = 0
+        with open(local_path, "rb") as local_file:
+            while True:
+                chunk = local_file.read(SYNC_DATA_MAX)
+                if not chunk: break
+                self._send(b"DATA", chunk)
+                sent += len(chunk)
+        self.sock.sendall(b"DONE" + struct.pack("<I", int(os.path.getmtime(local_path))))
+        header = _adb_recv_exact(self.sock, 8)
+        sync_id, length = header[:4], struct.unpack("<I", header[4:])[0]
+        if sync_id == b"FAIL":
+            self._read_fail(length)
+        if sync_id != b"OKAY":
+            raise AdbServerError(f"Unexpected sync response: {sync_id!r}")
+        return sent
+
+
+# --- Device File Browser ---
+FILE_BROWSER_CACHE_TTL = 30 # Seconds a directory listing stays valid
+FILE_BROWSER_INSERT_CHUNK = 500 # Rows inserted per UI tick so huge folders stay responsive
+FILE_BROWSER_PLACEHOLDER = "__loading__"
+
+# Per-device listing cache: {serial: {path: (fetched_at, [(name, mode, size, mtime), ...])}}
+file_browser_cache = {}
+file_browser_cache_lock = threading.Lock()
+
+def _browser_cache_get(serial, path):
+    with file_browser_cache_lock:
+        entry = file_browser_cache.get(serial, {}).get(path)
+    if entry and time.monotonic() - entry[0] < FILE_BROWSER_CACHE_TTL:
+        return entry[1]
+    return None
+
+def _browser_cache_put(serial, path, entries):
+    with file_browser_cache_lock:
+        file_browser_cache.setdefault(serial, {})[path] = (time.monotonic(), entries)
+
+def invalidate_browser_cache(serial, path=None):
+    """Drops cached listings for a device (all of them, or just one directory)."""
+    with file_browser_cache_lock:
+        if path is None:
+            file_browser_cache.pop(serial, None)
+        else:
+            file_browser_cache.get(serial, {}).pop(path, None)
+
+def _join_device_path(directory, name):
+    return directory.rstrip("/") + "/" + name if directory != "/" else "/" + name
+
+def _is_expandable(mode):
+    # Symlinks are offered as folders too: /sdcard itself is a link on most devices
+    return stat.S_ISDIR(mode) or stat.S_ISLNK(mode)
+
+def list_device_dir(serial, path, use_cache=True):
+    """Returns the sorted listing of a device directory, served from the per-device cache if fresh."""
+    if use_cache:
+        cached = _browser_cache_get(serial, path)
+        if cached is not None:
+            return cached
+    with SyncSession(serial) as sync:
+        # A trailing slash makes adbd follow a symlinked directory
+        entries = list(sync.list_dir(path.rstrip("/") + "/"))
+    entries.sort(key=lambda e: (not _is_expandable(e[1]), e[0].lower()))
+    _browser_cache_put(serial, path, entries)
+    return entries
+
+def _format_size(size):
+    for unit in ("B", "KB", "MB", "GB"):
+        if size < 1024 or unit == "GB":
+            return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+        size /= 1024
+
+def _walk_device_files(sync, remote_path, mode):
+    """Yields (remote_file, relative_path) for a file, or every file under a directory."""
+    if not _is_expandable(mode):
+        yield remote_path, posixpath.basename(remote_path)
+        return
+    base = posixpath.basename(remote_path.rstrip("/"))
+    pending = [(remote_path, base)]
+    while pending:
+        directory, relative = pending.pop()
+        for name, child_mode, _, _ in list(sync.list_dir(directory.rstrip("/") + "/")):
+            child_path = _join_device_path(directory, name)
+            if stat.S_ISDIR(child_mode):
+                pending.append((child_path, posixpath.join(relative, name)))
+            elif stat.S_ISREG(child_mode):
+                yield child_path, posixpath.join(relative, name)
+
+def _thread_batch_pull(serial, items, local_dir):
+    """Pulls many device files/folders over a single sync session."""
+    total_files, total_bytes, failed = 0, 0, 0
+    started = time.monotonic()
+    try:
+        with SyncSession(serial) as sync:
+            for remote_path, mode in items:
+                for remote_file, relative in _walk_device_files(sync, remote_path, mode):
+                    local_path = os.path.join(local_dir, *relative.split("/"))
+                    os.makedirs(os.path.dirname(local_path), exist_ok=True)
+                    try:
+                        total_bytes += sync.pull(remote_file, local_path)
+                        total_files += 1
+                    except AdbServerError as e:
+                        failed += 1
+                        log_message(f"[WARN] Could not pull {remote_file}: {e}", WARN_COLOR)
+                        if os.path.exists(local_path): os.remove(local_path) # Drop the partial file
+                        # adbd closes the sync session after a failed RECV
+                        sync.close()
+                        sync.sock = adb_server_connect("sync:", serial)
+        elapsed = max(time.monotonic() - started, 1e-6)
+        log_message(f"[ OK ] Pulled {total_files} file(s), {_format_size(total_bytes)} in {elapsed:.1f}s "
+                    f"({_format_size(total_bytes / elapsed)}/s) to {local_dir}.", OK_COLOR)
+        if failed:
+            log_message(f"[WARN] {failed} file(s) could not be pulled.", WARN_COLOR)
+    except (AdbServerError, OSError) as e:
+        log_message(f"[ERROR] Batch pull failed: {e}", ERROR_COLOR)
+    finally:
+        log_message("", tag_color=None)
+
+def _thread_batch_push(serial, local_paths, remote_dir, on_done=None):
+    """Pushes many local files into one device directory over a single sync session."""
+    total_bytes = 0
+    started = time.monotonic()
+    try:
+        with SyncSession(serial) as sync:
+            for local_path in local_paths:
+                remote_path = _join_device_path(remote_dir, os.path.basename(local_path))
+                total_bytes += sync.push(local_path, remote_path)
+        elapsed = max(time.monotonic() - started, 1e-6)
+        log_message(f"[ OK ] Pushed {len(local_paths)} file(s), {_format_size(total_bytes)} in {elapsed:.1f}s "
+                    f"({_format_size(total_bytes / elapsed)}/s) to {remote_dir}.", OK_COLOR)
+    except (AdbServerError, OSError) as e:
+        log_message(f"[ERROR] Batch push failed: {e}", ERROR_COLOR)
+    finally:
+        invalidate_browser_cache(serial, remote_dir)
+        if on_done: root.after(0, on_done)
+        log_message("", tag_color=None)
+
+def open_file_browser():
+    """Opens a lazy tree view of the device filesystem (directories are listed when expanded)."""
+    with_connected_devices(_file_browser_window)
+
+def _file_browser_window(devices):
+    window = tk.Toplevel(root)
+    window.title("Device File Browser")
+    window.geometry("760x560")
+    window.config(bg=DEFAULT_BACKGROUND_COLOR)
+
+    top_bar = ttk.Frame(window, padding="5", style="TFrame")
+    top_bar.pack(fill=tk.X)
+    ttk.Label(top_bar, text="Device").pack(side=tk.LEFT, padx=(0, 5))
+    serial_var = tk.StringVar(value=devices[0])
+    serial_box = ttk.Combobox(top_bar, textvariable=serial_var, values=devices, width=22, state="readonly")
+    serial_box.pack(side=tk.LEFT)
+    ttk.Label(top_bar, text="Root").pack(side=tk.LEFT, padx=(10, 5))
+    root_path_entry = ttk.Entry(top_bar, width=30)
+    root_path_entry.insert(0, "/sdcard")
+    root_path_entry.pack(side=tk.LEFT, fill=tk.X, expand=True)
+
+    tree_frame = ttk.Frame(window, padding=(5, 0, 5, 0), style="TFrame")
+    tree_frame.pack(expand=True, fill=tk.BOTH)
+    tree = ttk.Treeview(tree_frame, columns=("size", "modified", "mode"), selectmode="extended")
+    tree.heading("#0", text="Name")
+    tree.heading("size", text="Size")
+    tree.heading("modified", text="Modified")
+    tree.heading("mode", text="Mode")
+    tree.column("#0", width=330)
+    tree.column("size", width=90, anchor="e")
+    tree.column("modified", width=140)
+    tree.column("mode", width=90)
+    tree_scroll = ttk.Scrollbar(tree_frame, orient=tk.VERTICAL, command=tree.yview)
+    tree.configure(yscrollcommand=tree_scroll.set)
+    tree_scroll.pack(side=tk.RIGHT, fill=tk.Y)
+    tree.pack(expand=True, fill=tk.BOTH)
+
+    status_var = tk.StringVar(value="")
+    ttk.Label(window, textvariable=status_var).pack(fill=tk.X, padx=5)
+
+    # item id -> (device path, mode)
+    node_info = {}
+    # parent item id -> token of its latest load; a chunked insert stops once its token is replaced
+    load_tokens = {}
+    token_counter = itertools.count(1)
+
+    def add_placeholder(item):
+        tree.insert(item, tk.END, iid=f"{item}/{FILE_BROWSER_PLACEHOLDER}", text="Loading...")
+
+    def remove_children(parent):
+        """Deletes a node's children and forgets everything recorded for them (and their descendants)."""
+        tree.delete(*tree.get_children(parent))
+        for item in [i for i in node_info if not tree.exists(i)]:
+            del node_info[item]
+        for item in [i for i in load_tokens if i and not tree.exists(i)]:
+            del load_tokens[item] # Stops any insert still running into a removed folder
+
+    def insert_rows(parent, directory, entries, token, start=0):
+        if not tree.winfo_exists(): return
+        if load_tokens.get(parent) != token or (parent and not tree.exists(parent)):
+            return # Superseded by a newer load, or the parent was removed
+        end = min(start + FILE_BROWSER_INSERT_CHUNK, len(entries))
+        for name, mode, size, mtime in entries[start:end]:
+            path = _join_device_path(directory, name)
+            expandable = _is_expandable(mode)
+            item = tree.insert(parent, tk.END, text=name + ("/" if expandable else ""), values=(
+                "" if expandable else _format_size(size),
+                time.strftime("%Y-%m-%d %H:%M", time.localtime(mtime)),
+                stat.filemode(mode),
+            ))
+            node_info[item] = (path, mode)
+            if expandable: add_placeholder(item)
+        if end < len(entries):
+            status_var.set(f"{directory}: {end}/{len(entries)} entries shown...")
+            window.after(1, lambda: insert_rows(parent, directory, entries, token, end))
+        else:
+            status_var.set(f"{directory}: {len(entries)} entries")
+
+    def load_children(parent, directory, use_cache=True):
+        serial = serial_var.get()
+        token = load_tokens[parent] = next(token_counter) # Any older load of this folder is now stale
+        status_var.set(f"Listing {directory}...")
+
+        def worker():
+            try:
+                entries = list_device_dir(serial, directory, use_cache=use_cache)
+            except (AdbServerError, OSError) as e:
+                log_message(f"[ERROR] Could not list {directory}: {e}", ERROR_COLOR)
+                root.after(0, lambda: status_var.set(f"Failed to list {directory}"))
+                return
+            def show():
+                if not tree.winfo_exists() or serial != serial_var.get(): return
+                if load_tokens.get(parent) != token: return # A newer load or a removal replaced this one
+                remove_children(parent)
+                insert_rows(parent, directory, entries, token)
+            root.after(0, show)
+
+        threading.Thread(target=worker, daemon=True).start()
+
+    def load_root(use_cache=True):
+        directory = root_path_entry.get().strip() or "/"
+        remove_children("")
+        load_children("", directory, use_cache)
+
+    def on_open(event):
+        item = tree.focus()
+        children = tree.get_children(item)
+        if len(children) == 1 and children[0].endswith(FILE_BROWSER_PLACEHOLDER):
+            load_children(item, node_info[item][0])
+
+    def selected_directory():
+        """Directory of the focused item: the item itself if it's a folder, else its parent."""
+        item = tree.focus()
+        if item in node_info:
+            path, mode = node_info[item]
+            return (item, path) if _is_expandable(mode) else (tree.parent(item), posixpath.dirname(path) or "/")
+        return "", root_path_entry.get().strip() or "/"
+
+    def refresh():
+        item, directory = selected_directory()
+        invalidate_browser_cache(serial_var.get(), directory)
+        if item:
+            load_children(item, directory, use_cache=False)
+        else:
+            load_root(use_cache=False)
+
+    def pull_selected():
+        items = [node_info[i] for i in tree.selection() if i in node_info]
+        if not items:
+            log_message("[WARN] Select one or more files or folders to pull.", WARN_COLOR)
+            return
+        local_dir = filedialog.askdirectory(title="Select Destination Folder (PC)", parent=window)
+        if not local_dir: return
+        log_message(f"\n[EXEC] sync pull {len(items)} item(s) -> {local_dir}", EXEC_COLOR)
+        serial = serial_var.get()
+        command_scheduler.submit(lambda: _thread_batch_pull(serial, items, local_dir), PRIORITY_BULK, serial,
+                                 f"sync pull {len(items)} item(s)")
+
+    def push_here():
+        item, directory = selected_directory()
+        local_paths = filedialog.askopenfilenames(title="Select Files to Push (PC)", parent=window)
+        if not local_paths: return
+        log_message(f"\n[EXEC] sync push {len(local_paths)} file(s) -> {directory}", EXEC_COLOR)
+        on_done = (lambda: load_children(item, directory, use_cache=False)) if item else (lambda: load_root(False))
+        serial = serial_var.get()
+        command_scheduler.submit(lambda: _thread_batch_push(serial, list(local_paths), directory, on_done), PRIORITY_BULK,
+                                 serial, f"sync push {len(local_paths)} file(s)")
+
+    def use_paths(event=None):
+        """Copies the focused item into the main window's Push/Pull path fields."""
+        item = tree.focus()
+        if item not in node_info: return
+        path, mode = node_info[item]
+        if _is_expandable(mode):
+            device_path_entry_push.delete(0, tk.END)
+            device_path_entry_push.insert(0, path.rstrip("/") + "/")
+        else:
+            device_path_entry_pull.delete(0, tk.END)
+            device_path_entry_pull.insert(0, path)
+
+    tree.bind("<<TreeviewOpen>>", on_open)
+    tree.bind("<<TreeviewSelect>>", use_paths)
+    serial_box.bind("<<ComboboxSelected>>", lambda e: load_root())
+    root_path_entry.bind("<Return>", lambda e: load_root())
+
+    action_bar = ttk.Frame(window, padding="5", style="TFrame")
+    action_bar.pack(fill=tk.X)
+    for text, cmd in (("Go", load_root), ("Refresh", refresh), ("Pull Selected", pull_selected), ("Push Here", push_here)):
+        ttk.Button(action_bar, text=text, command=cmd, width=13).pack(side=tk.LEFT, padx=2)
+
+    load_root()
+
+
+# --- Reboot Orchestrator ---
+REBOOT_TIMEOUT = 300 # Seconds to wait for a device to come back
+BOOT_METRICS_FILE = os.path.join(APP_DATA_DIR, "boot_metrics.csv")
+# Runs on the device and returns once boot is complete and the boot animation has stopped
+BOOT_COMPLETED_WAIT_SCRIPT = (
+    'while [ "$(getprop sys.boot_completed)" != "1" ] || [ "$(getprop init.svc.bootanim)" = "running" ]; '
+    'do sleep 0.2; done; echo boot_completed'
+)
+
+def wait_for_device_state(serial, wanted, deadline):
+    """
+    Blocks on track-devices events until `wanted(state)` is true for `serial`
+    (state is None while the device is absent). Returns False on timeout.
+    """
+    try:
+        for devices in track_devices(timeout=max(deadline - time.monotonic(), 0.1)):
+            if wanted(devices.get(serial)):
+                return True
+            if time.monotonic() >= deadline:
+                return False
+    except socket.timeout:
+        return False
+
+def reboot_and_wait(serial, mode="", on_update=None):
+    """
+    Reboots one device and waits for it to come back.
+    Returns {"serial", "mode", "status", "time_to_adb", "time_to_boot"} (times in seconds, None if not reached).
+    """
+    result = {"serial": serial, "mode": mode or "normal", "status": "Rebooting", "time_to_adb": None, "time_to_boot": None}
+    def update(status):
+        result["status"] = status
+        if on_update: on_update(dict(result))
+
+    target_state = "recovery" if mode == "recovery" else "device"
+    deadline = time.monotonic() + REBOOT_TIMEOUT
+    phase = "shutdown" # Names the step a socket timeout happened in
+    try:
+        update("Rebooting")
+        started = time.monotonic()
+        sock = adb_server_connect(f"reboot:{mode}", serial)
+        try:
+            # adbd holds this stream open until the device actually powers off
+            sock.settimeout(max(deadline - time.monotonic(), 0.1))
+            adb_server_read_all(sock)
+        except ConnectionResetError:
+            pass # The link can drop mid-shutdown; track-devices confirms it below
+        finally:
+            sock.close()
+
+        # 1. Wait for the device to drop off, so we don't pick up its pre-reboot state
+        if not wait_for_device_state(serial, lambda state: state != "device", deadline):
+            update("Timeout (never went offline)")
+            return result
+        update("Waiting for adb")
+
+        # 2. Wait for adbd to come back
+        if not wait_for_device_state(serial, lambda state: state == target_state, deadline):
+            update("Timeout (adb)")
+            return result
+        result["time_to_adb"] = time.monotonic() - started
+        if mode:
+            update("Done")
+            return result
+        update("Waiting for boot")
+        phase = "boot"
+
+        # 3. Wait for boot completion on the device itself (one shell session, no host polling)
+        sock = adb_server_connect(f"shell:{BOOT_COMPLETED_WAIT_SCRIPT}", serial)
+        try:
+            sock.settimeout(max(deadline - time.monotonic(), 0.1))
+            output = adb_server_read_all(sock)
+        finally:
+            sock.close()
+        if b"boot_completed" not in output:
+            update("Boot wait interrupted")
+            return result
+        result["time_to_boot"] = time.monotonic() - started
+        update("Done")
+    except socket.timeout:
+        update(f"Timeout ({phase})")
+    except (AdbServerError, OSError) as e:
+        update(f"Error: {e}")
+    return result
+
+def _save_boot_metrics(results):
+    """Appends reboot results to the boot metrics CSV so boot times can be compared across runs."""
+    try:
+        os.makedirs(APP_DATA_DIR, exist_ok=True)
+        new_file = not os.path.exists(BOOT_METRICS_FILE)
+        with open(BOOT_METRICS_FILE, "a", newline="", encoding="utf-8") as metrics_file:
+            writer = csv.writer(metrics_file)
+            if new_file:
+                writer.writerow(["timestamp", "serial", "mode", "status", "time_to_adb_s", "time_to_boot_s"])
+            stamp = time.strftime("%Y-%m-%d %H:%M:%S")
+            for r in results:
+                writer.writerow([stamp, r["serial"], r["mode"], r["status"],
+                                 f"{r['time_to_adb']:.2f}" if r["time_to_adb"] is not None else "",
+                                 f"{r['time_to_boot']:.2f}" if r["time_to_boot"] is not None else ""])
+    except OSError as e:
+        log_message(f"[WARN] Could not save boot metrics: {e}", WARN_COLOR)
+
+def orchestrate_reboot(serials, mode="", on_update=None):
+    """Reboots all `serials` in parallel, waits for each to come back and records boot-time metrics."""
+    log_message(f"\n[EXEC] reboot {mode or 'normal'} x{len(serials)} device(s)", EXEC_COLOR)
+    results = [None] * len(serials)
+
+    def worker(index, serial):
+        results[index] = reboot_and_wait(serial, mode, on_update)
+
+    threads = [threading.Thread(target=worker, args=(i, s), daemon=True) for i, s in enumerate(serials)]
+    for thread in threads: thread.start()
+    for thread in threads: thread.join()
+
+    for r in results:
+        adb_time = f"{r['time_to_adb']:.1f}s" if r["time_to_adb"] is not None else "-"
+        boot_time = f"{r['time_to_boot']:.1f}s" if r["time_to_boot"] is not None else "-"
+        color = OK_COLOR if r["status"] == "Done" else ERROR_COLOR
+        log_message(f"[{' OK ' if r['status'] == 'Done' else 'FAIL'}] {r['serial']}: {r['status']} "
+                    f"(adb: {adb_time}, boot completed: {boot_time})", color)
+    _save_boot_metrics(results)
+    log_message(f"[INFO] Boot metrics appended to {BOOT_METRICS_FILE}", INFO_COLOR)
+    log_message("", tag_color=None)
+    return results
+
+def open_reboot_manager():
+    """Opens a window to reboot several devices at once and watch them come back."""
+    with_connected_devices(_reboot_manager_window)
+
+def _reboot_manager_window(devices):
+    window = tk.Toplevel(root)
+    window.title("Reboot Manager")
+    window.geometry("640x420")
+    window.config(bg=DEFAULT_BACKGROUND_COLOR)
+
+    top_bar = ttk.Frame(window, padding="5", style="TFrame")
+    top_bar.pack(fill=tk.X)
+    ttk.Label(top_bar, text="Mode").pack(side=tk.LEFT, padx=(0, 5))
+    mode_var = tk.StringVar(value="normal")
+    ttk.Combobox(top_bar, textvariable=mode_var, values=["normal", "recovery"], width=10, state="readonly").pack(side=tk.LEFT)
+
+    tree = ttk.Treeview(window, columns=("status", "adb", "boot"), selectmode="extended")
+    tree.heading("#0", text="Device")
+    tree.heading("status", text="Status")
+    tree.heading("adb", text="Time to ADB")
+    tree.heading("boot", text="Time to Boot Completed")
+    tree.column("#0", width=180)
+    tree.column("status", width=180)
+    tree.column("adb", width=100, anchor="e")
+    tree.column("boot", width=150, anchor="e")
+    tree.pack(expand=True, fill=tk.BOTH, padx=5)
+    for serial in devices:
+        tree.insert("", tk.END, iid=serial, text=serial, values=("Idle", "", ""))
+    tree.selection_set(devices)
+
+    def on_update(result):
+        def apply():
+            if not tree.winfo_exists() or not tree.exists(result["serial"]): return
+            tree.item(result["serial"], values=(
+                result["status"],
+                f"{result['time_to_adb']:.1f}s" if result["time_to_adb"] is not None else "",
+                f"{result['time_to_boot']:.1f}s" if result["time_to_boot"] is not None else "",
+            ))
+        root.after(0, apply)
+
+    def start():
+        serials = list(tree.selection())
+        if not serials:
+            log_message("[WARN] Select at least one device to reboot.", WARN_COLOR)
+            return
+        mode = "" if mode_var.get() == "normal" else mode_var.get()
+        if not messagebox.askyesno("Confirm Reboot", f"Reboot {len(serials)} device(s)?", parent=window):
+            return
+        reboot_button.configure(state=tk.DISABLED)
+        def run():
+            orchestrate_reboot(serials, mode, on_update)
+            root.after(0, lambda: reboot_button.winfo_exists() and reboot_button.configure(state=tk.NORMAL))
+        threading.Thread(target=run, daemon=True).start()
+
+    reboot_button = ttk.Button(top_bar, text="Reboot Selected", command=start, width=15)
+    reboot_button.pack(side=tk.LEFT, padx=10)
+
+
+# --- Large Log Viewer ---
+# Opens saved logcat/dump files of any size: the file is memory-mapped, a
+# sparse line index (one offset every LOG_INDEX_STRIDE lines) is built in the
+# background, and only the lines currently visible are decoded and shown.
+LOG_INDEX_STRIDE = 64
+LOG_SCAN_CHUNK = 16 * 1024 * 1024 # Bytes scanned per step when indexing/searching
+LOG_SEARCH_MAX_RESULTS = 10000
+LOG_STRIDE_RE = re.compile(rb"(?:[^\n]*\n){%d}" % LOG_INDEX_STRIDE)
+# "01-31 12:34:56.789" (threadtime/time) with an optional leading year
+LOG_TIMESTAMP_RE = re.compile(rb"^(?:\d{4}-)?(\d\d-\d\d) (\d\d:\d\d:\d\d(?:\.\d+)?)")
+
+class LogFileIndex:
+    """Memory-mapped text file with a sparse, incrementally built line index."""
+
+    def __init__(self, path):
+        self.path = path
+        self.file = open(path, "rb")
+        self.size = os.fstat(self.file.fileno()).st_size
+        self.mm = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ) if self.size else b""
+        self.checkpoints = array.array("Q", [0]) # Offset of line k * LOG_INDEX_STRIDE
+        self.line_count = 0 # Lines indexed so far
+        self.complete = False
+        self.cancelled = False
+
+    def close(self):
+        self.cancelled = True
+        if isinstance(self.mm, mmap.mmap):
+            try:
+                self.mm.close()
+            except BufferError:
+                pass # A reader thread still holds a slice; the GC will finish closing
+        self.file.close()
+
+    def build(self, on_progress=None):
+        """Indexes the whole file. Meant for a background thread; checks `cancelled` between chunks."""
+        pos = self.checkpoints[-1]
+        chunk_size = LOG_SCAN_CHUNK
+        while pos < self.size and not self.cancelled:
+            chunk = self.mm[pos:pos + chunk_size]
+            last_end = 0
+            for match in LOG_STRIDE_RE.finditer(chunk):
+                last_end = match.end()
+                self.checkpoints.append(pos + last_end)
+                self.line_count += LOG_INDEX_STRIDE
+            at_eof = pos + len(chunk) >= self.size
+            if at_eof:
+                tail = chunk[last_end:]
+                self.line_count += tail.count(b"\n") + (1 if tail and not tail.endswith(b"\n") else 0)
+                pos = self.size
+            elif last_end == 0:
+                chunk_size *= 2 # Very long lines: look further ahead
+                continue
+            else:
+                pos += last_end
+                chunk_size = LOG_SCAN_CHUNK
+            if on_progress: on_progress()
+        self.complete = not self.cancelled
+
+    def line_offset(self, line_number):
+        """Byte offset where `line_number` (0-based) starts."""
+        block, remainder = divmod(line_number, LOG_INDEX_STRIDE)
+        block = min(block, len(self.checkpoints) - 1)
+        remainder = line_number - block * LOG_INDEX_STRIDE
+        offset = self.checkpoints[block]
+        for _ in range(remainder):
+            newline = self.mm.find(b"\n", offset)
+            if newline == -1:
+                return self.size
+            offset = newline + 1
+        return offset
+
+    def read_lines(self, first, count):
+        """Returns up to `count` decoded lines starting at line `first`."""
+        start = self.line_offset(first)
+        lines = []
+        offset = start
+        while len(lines) < count and offset < self.size:
+            newline = self.mm.find(b"\n", offset)
+            end = self.size if newline == -1 else newline
+            lines.append(self.mm[offset:end].rstrip(b"\r").decode("utf-8", "replace"))
+            offset = end + 1
+        return lines
+
+    def search(self, pattern, on_match, max_results=LOG_SEARCH_MAX_RESULTS):
+        """Streams (line_number, line) for every line matching the compiled bytes regex."""
+        pos = 0
+        line_number = 0
+        found = 0
+        while pos < self.size and not self.cancelled:
+            chunk = self.mm[pos:pos + LOG_SCAN_CHUNK]
+            cut = chunk.rfind(b"\n") + 1 if pos + len(chunk) < self.size else len(chunk)
+            if cut == 0: cut = len(chunk) # One enormous line
+            chunk = chunk[:cut]
+            counted_to = 0
+            last_line_start = -1
+            for match in pattern.finditer(chunk):
+                line_start = chunk.rfind(b"\n", 0, match.start()) + 1
+                if line_start == last_line_start:
+                    continue # Only report each line once
+                line_number += chunk.count(b"\n", counted_to, line_start)
+                counted_to = line_start
+                last_line_start = line_start
+                line_end = chunk.find(b"\n", match.start())
+                on_match(line_number, chunk[line_start:line_end if line_end != -1 else None].decode("utf-8", "replace"))
+                found += 1
+                if found >= max_results or self.cancelled:
+                    return found
+            line_number += chunk.count(b"\n", counted_to)
+            pos += cut
+        return found
+
+    def _timestamp_at(self, line_number, limit=LOG_INDEX_STRIDE * 4):
+        """First timestamp at or after `line_number` (scans up to `limit` lines)."""
+        for line in self.read_lines(line_number, limit):
+            match = LOG_TIMESTAMP_RE.match(line.encode("utf-8", "replace"))
+            if match:
+                return match.group(1).decode(), match.group(2).decode()
+        return None
+
+    def find_timestamp(self, target):
+        """
+        Binary search for the first line whose timestamp is >= `target`
+        ("MM-DD HH:MM:SS[.mmm]" or just "HH:MM:SS"). Returns a line number or None.
+        Assumes timestamps increase through the file, as in a logcat capture.
+        """
+        has_date = " " in target.strip()
+        def key(stamp):
+            return f"{stamp[0]} {stamp[1]}" if has_date else stamp[1]
+        target = target.strip()
+
+        low, high = 0, len(self.checkpoints) - 1 # Search checkpoints first
+        while low < high:
+            mid = (low + high) // 2
+            stamp = self._timestamp_at(mid * LOG_INDEX_STRIDE)
+            if stamp is None or key(stamp) < target:
+                low = mid + 1
+            else:
+                high = mid
+        first = max(low - 1, 0) * LOG_INDEX_STRIDE
+        for i, line in enumerate(self.read_lines(first, LOG_INDEX_STRIDE * 2)):
+            match = LOG_TIMESTAMP_RE.match(line.encode("utf-8", "replace"))
+            if match and key((match.group(1).decode(), match.group(2).decode())) >= target:
+                return first + i
+        return None
+
+def open_log_viewer(path=None):
+    """Opens a saved log/dump file in a viewer that only renders the visible lines."""
+    if path is None:
+        path = filedialog.askopenfilename(title="Open Log File", filetypes=[("Log files", "*.txt *.log"), ("All files", "*.*")])
+        if not path: return
+    try:
+        index = LogFileIndex(path)
+    except OSError as e:
+        log_message(f"[ERROR] Could not open {path}: {e}", ERROR_COLOR)
+        return
+
+    window = tk.Toplevel(root)
+    window.title(f"Log Viewer - {os.path.basename(path)}")
+    window.geometry("1000x650")
+    window.config(bg=DEFAULT_BACKGROUND_COLOR)
+
+    search_bar = ttk.Frame(window, padding="5", style="TFrame")
+    search_bar.pack(fill=tk.X)
+    ttk.Label(search_bar, text="Regex").pack(side=tk.LEFT)
+    regex_entry = ttk.Entry(search_bar, width=30)
+    regex_entry.pack(side=tk.LEFT, padx=5)
+    ttk.Label(search_bar, text="Tag").pack(side=tk.LEFT)
+    tag_entry = ttk.Entry(search_bar, width=16)
+    tag_entry.pack(side=tk.LEFT, padx=5)
+    ttk.Label(search_bar, text="Time (MM-DD HH:MM:SS)").pack(side=tk.LEFT, padx=(10, 0))
+    time_entry = ttk.Entry(search_bar, width=20)
+    time_entry.pack(side=tk.LEFT, padx=5)
+
+    body = ttk.Frame(window, style="TFrame")
+    body.pack(expand=True, fill=tk.BOTH, padx=5)
+    view = tk.Text(body, wrap=tk.NONE, bg=TEXT_AREA_BG, fg=TEXT_AREA_FG, font=output_font, relief=tk.FLAT, state=tk.DISABLED)
+    view.tag_config("highlight", background="#44475A")
+    scrollbar = ttk.Scrollbar(body, orient=tk.VERTICAL)
+    scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+    view.pack(expand=True, fill=tk.BOTH)
+
+    results = tk.Listbox(window, height=8, bg=TEXT_AREA_BG, fg=TEXT_AREA_FG, font=output_font, relief=tk.FLAT)
+    results.pack(fill=tk.X, padx=5, pady=(5, 0))
+    status_var = tk.StringVar(value="Indexing...")
+    ttk.Label(window, textvariable=status_var).pack(fill=tk.X, padx=5)
+
+    state = {"top": 0, "highlight": None, "search_id": 0, "pending_jump": None}
+    result_lines = []
+
+    def visible_rows():
+        line_height = font.Font(font=output_font).metrics("linespace")
+        return max(view.winfo_height() // max(line_height, 1), 1)
+
+    def render():
+        if not view.winfo_exists(): return
+        rows = visible_rows()
+        total = max(index.line_count, 1)
+        state["top"] = max(0, min(state["top"], total - rows))
+        lines = index.read_lines(state["top"], rows)
+        view.config(state=tk.NORMAL)
+        view.delete("1.0", tk.END)
+        view.insert("1.0", "\n".join(lines))
+        if state["highlight"] is not None and 0 <= state["highlight"] - state["top"] < rows:
+            row = state["highlight"] - state["top"] + 1
+            view.tag_add("highlight", f"{row}.0", f"{row}.end+1c")
+        view.config(state=tk.DISABLED)
+        scrollbar.set(state["top"] / total, min((state["top"] + rows) / total, 1.0))
+
+    def scroll_command(action, amount, unit=None):
+        rows = visible_rows()
+        if action == "moveto":
+            state["top"] = int(float(amount) * index.line_count)
+        elif action == "scroll":
+            state["top"] += int(amount) * (rows if unit == "pages" else 1)
+        render()
+
+    def scroll_lines(amount):
+        state["top"] += amount
+        render()
+        return "break"
+
+    def jump_to(line_number):
+        state["highlight"] = line_number
+        state["top"] = max(line_number - visible_rows() // 3, 0)
+        render()
+
+    scrollbar.configure(command=scroll_command)
+    view.bind("<MouseWheel>", lambda e: scroll_lines(-3 if e.delta > 0 else 3))
+    view.bind("<Button-4>", lambda e: scroll_lines(-3)) # Linux wheel
+    view.bind("<Button-5>", lambda e: scroll_lines(3))
+    view.bind("<Prior>", lambda e: scroll_lines(-visible_rows()))
+    view.bind("<Next>", lambda e: scroll_lines(visible_rows()))
+    view.bind("<Up>", lambda e: scroll_lines(-1))
+    view.bind("<Down>", lambda e: scroll_lines(1))
+    view.bind("<Configure>", lambda e: render())
+
+    def index_progress():
+        root.after(0, lambda: status_var.set(f"Indexing... {index.line_count:,} lines") if window.winfo_exists() else None)
+
+    def build_index():
+        started = time.monotonic()
+        try:
+            index.build(on_progress=index_progress)
+        except (ValueError, OSError):
+            return # Window closed (mmap closed) while indexing
+        if index.complete:
+            elapsed = time.monotonic() - started
+            root.after(0, lambda: window.winfo_exists() and (
+                status_var.set(f"{index.line_count:,} lines, {_format_size(index.size)} (indexed in {elapsed:.1f}s)"),
+                render()))
+
+    def refresh_while_indexing():
+        if not window.winfo_exists(): return
+        pending = state["pending_jump"]
+        if pending is not None and (pending < index.line_count or index.complete):
+            state["pending_jump"] = None
+            jump_to(pending)
+        if index.complete: return
+        render()
+        window.after(500, refresh_while_indexing)
+
+    def run_search(event=None):
+        regex, tag = regex_entry.get(), tag_entry.get().strip()
+        parts = []
+        try:
+            if regex:
+                parts.append(re.compile(regex.encode("utf-8")).pattern)
+        except re.error as e:
+            status_var.set(f"Invalid regex: {e}")
+            return
+        if tag:
+            # Matches both "-v brief" (I/Tag( 123):) and "-v threadtime" (... I Tag: ) lines
+            escaped = re.escape(tag.encode("utf-8"))
+            parts.append(rb"(?:^[VDIWEF]/" + escaped + rb"\s*\(|\s[VDIWEF]\s+" + escaped + rb"\s*:)")
+        if not parts:
+            return
+        pattern = re.compile(b"^" + b"".join(b"(?=.*" + p + b")" for p in parts) + b".*", re.MULTILINE) if len(parts) > 1 \
+            else re.compile(parts[0], re.MULTILINE)
+        state["search_id"] += 1
+        search_id = state["search_id"]
+        results.delete(0, tk.END)
+        result_lines.clear()
+        status_var.set("Searching...")
+        pending = []
+        pending_lock = threading.Lock()
+
+        def on_match(line_number, line):
+            with pending_lock:
+                pending.append((line_number, line))
+
+        def flush():
+            if not window.winfo_exists() or search_id != state["search_id"]: return
+            with pending_lock:
+                batch = pending[:]
+                pending.clear()
+            for line_number, line in batch:
+                result_lines.append(line_number)
+                results.insert(tk.END, f"{line_number + 1:>10}: {line[:300]}")
+            if worker.is_alive() or pending:
+                window.after(100, flush)
+            else:
+                status_var.set(f"{len(result_lines):,} match(es)" +
+                               (f" (first {LOG_SEARCH_MAX_RESULTS:,} shown)" if len(result_lines) >= LOG_SEARCH_MAX_RESULTS else ""))
+
+        def search():
+            try:
+                index.search(pattern, lambda n, l: search_id == state["search_id"] and on_match(n, l))
+            except (ValueError, OSError):
+                pass # File closed while searching
+
+        worker = threading.Thread(target=search, daemon=True)
+        worker.start()
+        flush()
+
+    def jump_to_time(event=None):
+        target = time_entry.get().strip()
+        if not target: return
+        line_number = index.find_timestamp(target)
+        if line_number is None:
+            status_var.set(f"No line at or after {target}" + ("" if index.complete else " (still indexing)"))
+        else:
+            jump_to(line_number)
+
+    def on_result_select(event):
+        selection = results.curselection()
+        if not selection: return
+        line_number = result_lines[selection[0]]
+        if line_number >= index.line_count and not index.complete:
+            # Seeking there would walk line by line from the last checkpoint on the Tk thread
+            state["pending_jump"] = line_number
+            status_var.set(f"Line {line_number + 1:,} is not indexed yet; jumping there when indexing reaches it")
+        else:
+            state["pending_jump"] = None
+            jump_to(line_number)
+
+    def on_close():
+        index.close()
+        window.destroy()
+
+    regex_entry.bind("<Return>", run_search)
+    tag_entry.bind("<Return>", run_search)
+    time_entry.bind("<Return>", jump_to_time)
+    results.bind("<<ListboxSelect>>", on_result_select)
+    ttk.Button(search_bar, text="Search", command=run_search, width=10).pack(side=tk.LEFT, padx=2)
+    ttk.Button(search_bar, text="Jump", command=jump_to_time, width=8).pack(side=tk.LEFT, padx=2)
+    window.protocol("WM_DELETE_WINDOW", on_close)
+
+    threading.Thread(target=build_index, daemon=True).start()
+    window.after(200, refresh_while_indexing)
+
+
+# --- Crash & ANR Detector ---
+# Watches the logcat stream for crashes. Every line goes through one compiled
+# multi-keyword prefilter; only lines that hit a keyword are confirmed with
+# the pattern's own regex. Multi-line traces (stack traces, tombstones, ANR
+# details) are grouped per (tag, pid), reduced to a signature and counted
+# per device. A trace ends at the first line from another tag/pid, at a line
+# that can't continue it, or after a short quiet period, so a crash is
+# reported right away even on a quiet device.
+# Runs on its own thread so it never holds back the display.
+CRASH_TRACE_MAX_LINES = 200
+CRASH_TRACE_IDLE_SECONDS = 1.0 # Close a trace when its device has been quiet this long
+CRASH_SIGNAL_WAIT_SECONDS = 3.0 # How long a "Fatal signal" waits for its tombstone
+CRASH_SIGNATURE_FRAMES = 5 # Top frames that make up a crash signature
+CRASH_QUEUE_SIZE = 100000
+
+# (kind, literal keyword for the prefilter, confirming regex)
+CRASH_PATTERNS = [
+    ("Java crash", "FATAL EXCEPTION", r"FATAL EXCEPTION: (?P<title>.+)"),
+    ("ANR", "ANR in ", r"ANR in (?P<title>\S+)"),
+    ("Native crash", "*** *** *** *** ***", r"\*\*\* \*\*\* \*\*\*"),
+    ("Fatal signal", "Fatal signal ", r"Fatal signal (?P<title>\d+ \(\w+\))"),
+]
+# "E/AndroidRuntime( 1234): msg" (-v brief) and "01-31 12:00:00.000  1234  1240 E AndroidRuntime: msg" (-v threadtime)
+LOGCAT_BRIEF_RE = re.compile(r"^([VDIWEFA])/(.+?)\(\s*(\d+)\): ?(.*)$")
+LOGCAT_THREADTIME_RE = re.compile(r"^(?:\d{4}-)?\d\d-\d\d \d\d:\d\d:\d\d\.\d+\s+(\d+)\s+\d+ ([VDIWEFA]) (.+?)\s*: ?(.*)$")
+JAVA_FRAME_RE = re.compile(r"^\s*at (\S+?)(?:\(|$)")
+JAVA_EXCEPTION_RE = re.compile(r"^((?:[\w$]+\.)+[\w$]*(?:Exception|Error|Throwable))(?::|$)")
+NATIVE_FRAME_RE = re.compile(r"#\d+ pc [0-9a-fA-F]+\s+(\S+)(?:\s+\((.+?)(?:\+\d+)?\))?")
+NATIVE_PROCESS_RE = re.compile(r">>> (\S+) <<<")
+NATIVE_SIGNAL_RE = re.compile(r"signal (\d+ \(\w+\))")
+ANR_REASON_RE = re.compile(r"Reason: (.+)")
+# Once a Java trace has frames, anything else ends it
+JAVA_CONTINUATION_RE = re.compile(r"^\s*(?:at |\.\.\. \d+ more|Caused by: |Suppressed: )")
+
+def parse_logcat_line(line):
+    """Returns (tag, pid, message) for brief/threadtime lines, or (None, None, line) if unrecognised."""
+    match = LOGCAT_BRIEF_RE.match(line)
+    if match:
+        return match.group(2).strip(), match.group(3), match.group(4)
+    match = LOGCAT_THREADTIME_RE.match(line)
+    if match:
+        return match.group(3), match.group(1), match.group(4)
+    return None, None, line
+
+class CrashRecord:
+    """One distinct crash signature and how often it was seen on each device."""
+    def __init__(self, signature, kind, title, lines):
+        self.signature = signature
+        self.kind = kind
+        self.title = title
+        self.sample = lines
+        self.device_counts = collections.Counter()
+        self.first_seen = self.last_seen = time.time()
+
+    @property
+    def count(self):
+        return sum(self.device_counts.values())
+
+class CrashDetector:
+    """Streaming crash/ANR detector shared by every logcat stream."""
+
+    def __init__(self, patterns=CRASH_PATTERNS):
+        self.lock = threading.Lock()
+        self.records = {} # signature -> CrashRecord
+        self.open_traces = {} # (device, tag, pid) -> trace dict
+        self.lines_seen = collections.Counter() # device -> lines scanned
+        self.dropped = 0
+        self.set_patterns(patterns)
+        self.queue = queue.Queue(maxsize=CRASH_QUEUE_SIZE)
+        threading.Thread(target=self._run, daemon=True).start()
+
+    def set_patterns(self, patterns):
+        """(Re)compiles the prefilter from (kind, keyword, regex) tuples."""
+        self.patterns = list(patterns)
+        self.keyword_kinds = {keyword: (kind, re.compile(regex)) for kind, keyword, regex in self.patterns}
+        self.prefilter = re.compile("|".join(re.escape(keyword) for _, keyword, _ in self.patterns))
+
+    def add_custom_pattern(self, keyword, regex=None):
+        self.set_patterns(self.patterns + [("Custom", keyword, regex or re.escape(keyword))])
+
+    # -- Producer side (logcat reader thread) --
+    def feed(self, device, line):
+        """Queues a logcat line. Never blocks: lines are dropped (and counted) if the detector falls behind."""
+        try:
+            self.queue.put_nowait((device, line))
+        except queue.Full:
+            self.dropped += 1
+
+    def flush(self, device):
+        """Closes every open trace for a device (e.g. when its logcat stream ends)."""
+        self.queue.put((device, None))
+
+    # -- Detector thread --
+    def _run(self):
+        while True:
+            try:
+                device, line = self.queue.get(timeout=CRASH_TRACE_IDLE_SECONDS / 2)
+            except queue.Empty:
+                device, line = None, None
+            try:
+                if device is None:
+                    pass # Quiet: only the idle check below
+                elif line is None:
+                    for key in [k for k in self.open_traces if k[0] == device]:
+                        self._finish(key)
+                else:
+                    self.process_line(device, line)
+                if self.open_traces:
+                    self.expire_idle()
+            except Exception as e:
+                print(f"Crash detector error: {e}")
+
+    def expire_idle(self, now=None):
+        """Finishes traces that stopped receiving lines (and Fatal signals no tombstone followed)."""
+        now = time.monotonic() if now is None else now
+        for key, trace in list(self.open_traces.items()):
+            limit = CRASH_SIGNAL_WAIT_SECONDS if trace["kind"] == "Fatal signal" else CRASH_TRACE_IDLE_SECONDS
+            if now - trace["updated"] >= limit:
+                self._finish(key)
+
+    def process_line(self, device, line):
+        if device not in self.lines_seen:
+            with self.lock: # New keys only under the lock; snapshot() iterates this
+                self.lines_seen[device] = 0
+        self.lines_seen[device] += 1
+        if self.open_traces:
+            tag, pid, message = parse_logcat_line(line)
+            key = (device, tag, pid)
+            for open_key, trace in list(self.open_traces.items()):
+                # Another tag/pid on the same device ends a trace; a Fatal signal waits for its tombstone instead
+                if open_key != key and open_key[0] == device and trace["kind"] != "Fatal signal":
+                    self._finish(open_key)
+            trace = self.open_traces.get(key)
+            if trace and not self.prefilter.search(line):
+                if trace["kind"] == "Java crash" and trace["frames"] and not JAVA_CONTINUATION_RE.match(message):
+                    self._finish(key) # Past the end of the stack trace
+                else:
+                    trace["lines"].append(message)
+                    trace["updated"] = time.monotonic()
+                    trace["frames"] = trace["frames"] or bool(JAVA_FRAME_RE.match(message))
+                    if len(trace["lines"]) >= CRASH_TRACE_MAX_LINES:
+                        self._finish(key)
+                    return
+
+        hit = self.prefilter.search(line)
+        if not hit:
+            return
+        kind, confirm = self.keyword_kinds[hit.group(0)]
+        match = confirm.search(line)
+        if not match:
+            return
+        tag, pid, message = parse_logcat_line(line)
+        key = (device, tag, pid)
+        if key in self.open_traces:
+            self._finish(key)
+        if kind == "Native crash":
+            # libc logs "Fatal signal" just before the tombstone; the tombstone is the better record
+            for open_key in [k for k, t in self.open_traces.items() if k[0] == device and t["kind"] == "Fatal signal"]:
+                del self.open_traces[open_key]
+        title = match.groupdict().get("title") or message.strip()
+        self.open_traces[key] = {"kind": kind, "title": title, "lines": [message], "updated": time.monotonic(), "frames": False}
+        if kind == "Custom":
+            self._finish(key) # Single-line event
+        # "Fatal signal" stays open for CRASH_SIGNAL_WAIT_SECONDS, so a following tombstone can replace it
+
+    def _finish(self, key):
+        trace = self.open_traces.pop(key, None)
+        if not trace: return
+        device = key[0]
+        kind, title, lines = trace["kind"], trace["title"], trace["lines"]
+        parts = [kind]
+        if kind == "Java crash":
+            process = next((l.split(",")[0][9:] for l in lines if l.startswith("Process: ")), "")
+            exception = next((m.group(1) for m in map(JAVA_EXCEPTION_RE.match, lines) if m), "")
+            frames = [m.group(1) for m in map(JAVA_FRAME_RE.match, lines) if m][:CRASH_SIGNATURE_FRAMES]
+            title = f"{process or title}: {exception or lines[1 if len(lines) > 1 else 0]}"
+            parts += [process, exception] + frames
+        elif kind == "Native crash":
+            process = next((m.group(1) for m in map(NATIVE_PROCESS_RE.search, lines) if m), "")
+            signal_name = next((m.group(1) for m in map(NATIVE_SIGNAL_RE.search, lines) if m), "")
+            # Addresses change between runs; the library and symbol don't
+            frames = [f"{m.group(1)} {m.group(2) or ''}".strip() for m in map(NATIVE_FRAME_RE.search, lines) if m][:CRASH_SIGNATURE_FRAMES]
+            title = f"{process or 'unknown'}: signal {signal_name or '?'}"
+            parts += [process, signal_name] + frames
+        elif kind == "ANR":
+            reason = next((m.group(1) for m in map(ANR_REASON_RE.search, lines) if m), "")
+            title = f"{title}: {reason}" if reason else title
+            parts += [trace["title"], re.sub(r"\d+", "#", reason)]
+        else:
+            parts.append(re.sub(r"\d+", "#", title))
+        signature = hashlib.sha1("\n".join(parts).encode("utf-8", "replace")).hexdigest()[:12]
+
+        with self.lock:
+            record = self.records.get(signature)
+            is_new = record is None
+            if is_new:
+                record = self.records[signature] = CrashRecord(signature, kind, title, lines)
+            record.device_counts[device] += 1
+            record.last_seen = time.time()
+        if is_new:
+            log_message(f"[CRASH] {kind} on {device}: {title} (signature {signature})", ERROR_COLOR)
+
+    def snapshot(self):
+        """
+        Returns ([(record, [(device, count), ...])] newest first, {device: lines scanned}, dropped lines),
+        copied under the lock so the UI never iterates something the detector thread is changing.
+        """
+        with self.lock:
+            rows = [(record, record.device_counts.most_common())
+                    for record in sorted(self.records.values(), key=lambda r: r.last_seen, reverse=True)]
+            return rows, dict(self.lines_seen), self.dropped
+
+    def clear(self):
+        with self.lock:
+            self.records.clear()
+            self.lines_seen.clear()
+            self.dropped = 0
+
+crash_detector = CrashDetector()
+
+def open_crash_report():
+    """Shows detected crashes/ANRs grouped by signature with per-device counts."""
+    window = tk.Toplevel(root)
+    window.title("Crash & ANR Report")
+    window.geometry("900x560")
+    window.config(bg=DEFAULT_BACKGROUND_COLOR)
+
+    tree = ttk.Treeview(window, columns=("kind", "count", "devices", "last"), selectmode="browse", height=10)
+    tree.heading("#0", text="Crash")
+    tree.heading("kind", text="Kind")
+    tree.heading("count", text="Count")
+    tree.heading("devices", text="Devices")
+    tree.heading("last", text="Last Seen")
+    tree.column("#0", width=420)
+    tree.column("kind", width=100)
+    tree.column("count", width=60, anchor="e")
+    tree.column("devices", width=180)
+    tree.column("last", width=90)
+    tree.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
+
+    detail = scrolledtext.ScrolledText(window, height=12, wrap=tk.NONE, bg=TEXT_AREA_BG, fg=TEXT_AREA_FG, font=output_font, relief=tk.FLAT)
+    detail.pack(fill=tk.BOTH, expand=True, padx=5)
+    status_var = tk.StringVar()
+    ttk.Label(window, textvariable=status_var).pack(fill=tk.X, padx=5)
+
+    records = {}
+
+    def refresh():
+        if not tree.winfo_exists(): return
+        rows, lines_seen, dropped = crash_detector.snapshot()
+        for record, device_counts in rows:
+            records[record.signature] = record
+            values = (record.kind, sum(n for _, n in device_counts),
+                      ", ".join(f"{d} x{n}" for d, n in device_counts),
+                      time.strftime("%H:%M:%S", time.localtime(record.last_seen)))
+            if tree.exists(record.signature):
+                tree.item(record.signature, values=values)
+            else:
+                tree.insert("", 0, iid=record.signature, text=record.title, values=values)
+        scanned = ", ".join(f"{d}: {n:,}" for d, n in lines_seen.items()) or "none"
+        status_var.set(f"Lines scanned - {scanned}" + (f" | {dropped:,} dropped" if dropped else ""))
+        window.after(1000, refresh)
+
+    def show_detail(event=None):
+        selection = tree.selection()
+        if not selection: return
+        record = records[selection[0]]
+        detail.delete("1.0", tk.END)
+        detail.insert("1.0", f"Signature: {record.signature}\n" + "\n".join(record.sample))
+
+    def clear_report():
+        crash_detector.clear()
+        records.clear()
+        tree.delete(*tree.get_children())
+        detail.delete("1.0", tk.END)
+
+    def add_pattern():
+        keyword = custom_entry.get().strip()
+        if not keyword: return
+        crash_detector.add_custom_pattern(keyword)
+        log_message(f"[INFO] Crash detector now also watches for: {keyword}", INFO_COLOR)
+        custom_entry.delete(0, tk.END)
+
+    tree.bind("<<TreeviewSelect>>", show_detail)
+    button_bar = ttk.Frame(window, padding="5", style="TFrame")
+    button_bar.pack(fill=tk.X)
+    ttk.Button(button_bar, text="Clear", command=clear_report, width=10).pack(side=tk.LEFT, padx=2)
+    ttk.Label(button_bar, text="Custom signature").pack(side=tk.LEFT, padx=(15, 5))
+    custom_entry = ttk.Entry(button_bar, width=30)
+    custom_entry.pack(side=tk.LEFT)
+    ttk.Button(button_bar, text="Add", command=add_pattern, width=8).pack(side=tk.LEFT, padx=2)
+    refresh()
+
+
+# --- Port Forward & Reverse Manager ---
+PORT_RULES_FILE = os.path.join(APP_DATA_DIR, "port_rules.json")
+PORT_TEST_LATENCY_PINGS = 50
+PORT_WATCHER_RETRY_MIN = 2 # Seconds between checks for a stopped adb server, doubling...
+PORT_WATCHER_RETRY_MAX = 30 # ...up to this
+
+# Rules to restore whenever a device (re)connects: {serial: [[kind, local, remote], ...]}
+kept_port_rules = {}
+kept_port_rules_lock = threading.Lock()
+port_rule_watcher_started = False
+
+def _load_kept_port_rules():
+    try:
+        with open(PORT_RULES_FILE, encoding="utf-8") as rules_file:
+            kept_port_rules.update(json.load(rules_file))
+    except (OSError, ValueError):
+        pass # No saved rules yet
+
+def _save_kept_port_rules():
+    try:
+        os.makedirs(APP_DATA_DIR, exist_ok=True)
+        with kept_port_rules_lock:
+            data = json.dumps(kept_port_rules, indent=2)
+        with open(PORT_RULES_FILE, "w", encoding="utf-8") as rules_file:
+            rules_file.write(data)
+    except OSError as e:
+        log_message(f"[WARN] Could not save port rules: {e}", WARN_COLOR)
+
+def list_port_rules(serial):
+    """Returns [(kind, local, remote), ...] for a device; kind is "forward" or "reverse"."""
+    rules = []
+    stdout, _, retcode = run_adb_command(["-s", serial, "forward", "--list"], display_output=False,
+                                         command_name="List Forwards", sync=True)
+    if retcode == 0:
+        for line in stdout.splitlines():
+            parts = line.split()
+            if len(parts) == 3 and parts[0] == serial:
+                rules.append(("forward", parts[1], parts[2]))
+    stdout, _, retcode = run_adb_command(["-s", serial, "reverse", "--list"], display_output=False,
+                                         command_name="List Reverses", sync=True)
+    if retcode == 0:
+        for line in stdout.splitlines():
+            parts = line.split()
+            if len(parts) >= 3:
+                rules.append(("reverse", parts[-2], parts[-1]))
+    return rules
+
+def add_port_rule(serial, kind, local, remote, keep_alive=True):
+    """Creates a forward (host local -> device remote) or reverse (device local -> host remote) rule."""
+    _, _, retcode = run_adb_command(["-s", serial, kind, local, remote], command_name=f"Add {kind.title()}", sync=True)
+    if retcode == 0 and keep_alive:
+        with kept_port_rules_lock:
+            rules = kept_port_rules.setdefault(serial, [])
+            rules[:] = [r for r in rules if not (r[0] == kind and r[1] == local)] + [[kind, local, remote]]
+        _save_kept_port_rules()
+        start_port_rule_watcher()
+    return retcode == 0
+
+def remove_port_rule(serial, kind, local):
+    with kept_port_rules_lock:
+        if serial in kept_port_rules:
+            kept_port_rules[serial] = [r for r in kept_port_rules[serial] if not (r[0] == kind and r[1] == local)]
+    _save_kept_port_rules()
+    _, _, retcode = run_adb_command(["-s", serial, kind, "--remove", local], command_name=f"Remove {kind.title()}", sync=True)
+    return retcode == 0
+
+def _restore_port_rules(serial):
+    with kept_port_rules_lock:
+        rules = [tuple(r) for r in kept_port_rules.get(serial, [])]
+    if not rules: return
+    log_message(f"[INFO] {serial} connected, restoring {len(rules)} port rule(s)...", INFO_COLOR)
+    for kind, local, remote in rules:
+        run_adb_command(["-s", serial, kind, local, remote], command_name=f"Restore {kind.title()}", sync=True)
+
+def _port_rule_watcher():
+    """
+    Re-applies kept rules whenever a device enters the "device" state (reconnect, reboot, server restart).
+    Never starts the adb server itself: while it is down (e.g. after Kill Server) it waits quietly,
+    backing off, until something else starts it.
+    """
+    previous = {}
+    backoff = PORT_WATCHER_RETRY_MIN
+    while True:
+        try:
+            for devices in track_devices(autostart=False):
+                backoff = PORT_WATCHER_RETRY_MIN
+                for serial, state in devices.items():
+                    if state == "device" and previous.get(serial) != "device":
+                        threading.Thread(target=_restore_port_rules, args=(serial,), daemon=True).start()
+                previous = devices
+        except (AdbServerError, OSError):
+            previous = {} # Server went away: everything counts as reconnected once it's back
+        time.sleep(backoff)
+        backoff = min(backoff * 2, PORT_WATCHER_RETRY_MAX)
+
+def start_port_rule_watcher():
+    global port_rule_watcher_started
+    if port_rule_watcher_started: return
+    port_rule_watcher_started = True
+    threading.Thread(target=_port_rule_watcher, daemon=True).start()
+
+class _EchoHandler(socketserver.BaseRequestHandler):
+    def handle(self):
+        while True:
+            data = self.request.recv(65536)
+            if not data: return
+            self.request.sendall(data)
+
+def _free_host_port():
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        return probe.getsockname()[1]
+
+def run_port_throughput_test(serial, payload_mb=16):
+    """
+    Measures round-trip throughput and latency through the device's adb link.
+    Data goes host:L -> (forward) -> device:E -> (reverse) -> host echo server on E
+    and back, so nothing needs to run on the device.
+    Returns {"throughput": bytes/s, "latency_ms": median, "latency_p95_ms": ...} or None.
+    """
+    echo_server = socketserver.ThreadingTCPServer(("127.0.0.1", 0), _EchoHandler)
+    echo_server.daemon_threads = True
+    threading.Thread(target=echo_server.serve_forever, daemon=True).start()
+    echo_port = echo_server.server_address[1]
+    local_port = _free_host_port()
+    forward_spec, reverse_spec = f"tcp:{local_port}", f"tcp:{echo_port}"
+    try:
+        if not add_port_rule(serial, "reverse", reverse_spec, reverse_spec, keep_alive=False):
+            return None
+        if not add_port_rule(serial, "forward", forward_spec, reverse_spec, keep_alive=False):
+            return None
+
+        with socket.create_connection(("127.0.0.1", local_port), timeout=15) as sock:
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            # Latency: small ping-pongs
+            rtts = []
+            for _ in range(PORT_TEST_LATENCY_PINGS):
+                started = time.perf_counter()
+                sock.sendall(b"p")
+                _adb_recv_exact(sock, 1)
+                rtts.append((time.perf_counter() - started) * 1000)
+            rtts.sort()
+
+            # Throughput: stream the payload while reading the echo back
+            total = int(payload_mb * 1024 * 1024)
+            block = os.urandom(64 * 1024)
+            def sender():
+                remaining = total
+                while remaining > 0:
+                    sock.sendall(block[:min(remaining, len(block))])
+                    remaining -= len(block)
+            started = time.perf_counter()
+            send_thread = threading.Thread(target=sender, daemon=True)
+            send_thread.start()
+            received = 0
+            while received < total:
+                chunk = sock.recv(256 * 1024)
+                if not chunk:
+                    raise AdbServerError("Echo stream closed early.")
+                received += len(chunk)
+            elapsed = time.perf_counter() - started
+            send_thread.join()
+        return {
+            "throughput": total / elapsed,
+            "latency_ms": rtts[len(rtts) // 2],
+            "latency_p95_ms": rtts[int(len(rtts) * 0.95) - 1],
+        }
+    except (AdbServerError, OSError) as e:
+        log_message(f"[ERROR] Throughput test failed: {e}", ERROR_COLOR)
+        return None
+    finally:
+        remove_port_rule(serial, "forward", forward_spec)
+        remove_port_rule(serial, "reverse", reverse_spec)
+        echo_server.shutdown()
+        echo_server.server_close()
+
+def open_port_manager():
+    """Lists, adds and removes forward/reverse rules per device, and runs link throughput tests."""
+    with_connected_devices(_port_manager_window)
+
+def _port_manager_window(devices):
+    start_port_rule_watcher()
+
+    window = tk.Toplevel(root)
+    window.title("Port Forwards & Reverses")
+    window.geometry("720x440")
+    window.config(bg=DEFAULT_BACKGROUND_COLOR)
+
+    top_bar = ttk.Frame(window, padding="5", style="TFrame")
+    top_bar.pack(fill=tk.X)
+    ttk.Label(top_bar, text="Device").pack(side=tk.LEFT, padx=(0, 5))
+    serial_var = tk.StringVar(value=devices[0])
+    serial_box = ttk.Combobox(top_bar, textvariable=serial_var, values=devices, width=22, state="readonly")
+    serial_box.pack(side=tk.LEFT)
+
+    tree = ttk.Treeview(window, columns=("local", "remote", "kept"), selectmode="extended")
+    tree.heading("#0", text="Type")
+    tree.heading("local", text="Local")
+    tree.heading("remote", text="Remote")
+    tree.heading("kept", text="Kept Alive")
+    tree.column("#0", width=100)
+    tree.column("local", width=220)
+    tree.column("remote", width=220)
+    tree.column("kept", width=90)
+    tree.pack(expand=True, fill=tk.BOTH, padx=5)
+
+    add_bar = ttk.Frame(window, padding="5", style="TFrame")
+    add_bar.pack(fill=tk.X)
+    kind_var = tk.StringVar(value="forward")
+    ttk.Combobox(add_bar, textvariable=kind_var, values=["forward", "reverse"], width=9, state="readonly").pack(side=tk.LEFT)
+    ttk.Label(add_bar, text="Local").pack(side=tk.LEFT, padx=(10, 5))
+    local_entry = ttk.Entry(add_bar, width=18)
+    local_entry.insert(0, "tcp:8080")
+    local_entry.pack(side=tk.LEFT)
+    ttk.Label(add_bar, text="Remote").pack(side=tk.LEFT, padx=(10, 5))
+    remote_entry = ttk.Entry(add_bar, width=24)
+    remote_entry.insert(0, "tcp:8080")
+    remote_entry.pack(side=tk.LEFT)
+    keep_var = tk.BooleanVar(value=True)
+    tk.Checkbutton(add_bar, text="Keep alive", variable=keep_var, bg=DEFAULT_BACKGROUND_COLOR, fg=LABEL_FG,
+                   selectcolor=ENTRY_BG, activebackground=DEFAULT_BACKGROUND_COLOR).pack(side=tk.LEFT, padx=10)
+
+    status_var = tk.StringVar()
+    ttk.Label(window, textvariable=status_var).pack(fill=tk.X, padx=5)
+
+    def in_background(work, then=None):
+        def run():
+            result = work()
+            if then: root.after(0, lambda: window.winfo_exists() and then(result))
+        threading.Thread(target=run, daemon=True).start()
+
+    def refresh():
+        serial = serial_var.get()
+        def show(rules):
+            tree.delete(*tree.get_children())
+            with kept_port_rules_lock:
+                kept = {(r[0], r[1]) for r in kept_port_rules.get(serial, [])}
+            for kind, local, remote in rules:
+                tree.insert("", tk.END, text=kind, values=(local, remote, "yes" if (kind, local) in kept else ""))
+        in_background(lambda: list_port_rules(serial), show)
+
+    def add():
+        serial, kind, local, remote = serial_var.get(), kind_var.get(), local_entry.get().strip(), remote_entry.get().strip()
+        if not local or not remote:
+            log_message("[WARN] Enter both a local and a remote spec (e.g. tcp:8080, localabstract:chrome_devtools_remote).", WARN_COLOR)
+            return
+        in_background(lambda: add_port_rule(serial, kind, local, remote, keep_var.get()), lambda ok: refresh())
+
+    def remove():
+        serial = serial_var.get()
+        selected = [(tree.item(i, "text"), tree.item(i, "values")[0]) for i in tree.selection()]
+        in_background(lambda: [remove_port_rule(serial, kind, local) for kind, local in selected], lambda ok: refresh())
+
+    def throughput_test():
+        serial = serial_var.get()
+        try:
+            payload_mb = float(size_entry.get())
+        except ValueError:
+            log_message("[WARN] Enter the test size in MB.", WARN_COLOR)
+            return
+        status_var.set(f"Testing {serial} with {payload_mb:g} MB...")
+        def show(result):
+            if not result:
+                status_var.set("Throughput test failed (see output).")
+                return
+            summary = (f"{serial}: {_format_size(result['throughput'])}/s round-trip, latency median "
+                       f"{result['latency_ms']:.2f} ms, p95 {result['latency_p95_ms']:.2f} ms")
+            status_var.set(summary)
+            log_message(f"[ OK ] Throughput test - {summary}", OK_COLOR)
+        in_background(lambda: run_port_throughput_test(serial, payload_mb), show)
+
+    serial_box.bind("<<ComboboxSelected>>", lambda e: refresh())
+    button_bar = ttk.Frame(window, padding="5", style="TFrame")
+    button_bar.pack(fill=tk.X)
+    for text, cmd in (("Add", add), ("Remove Selected", remove), ("Refresh", refresh)):
+        ttk.Button(button_bar, text=text, command=cmd, width=15).pack(side=tk.LEFT, padx=2)
+    ttk.Label(button_bar, text="Test MB").pack(side=tk.LEFT, padx=(15, 5))
+    size_entry = ttk.Entry(button_bar, width=6)
+    size_entry.insert(0, "16")
+    size_entry.pack(side=tk.LEFT)
+    ttk.Button(button_bar, text="Throughput Test", command=throughput_test, width=15).pack(side=tk.LEFT, padx=2)
+    refresh()
+
+
+# --- Screen Recording (streamed H.264) ---
+# screenrecord writes raw H.264 to stdout over an exec: stream, so nothing is
+# stored on the device. The on-device 3 minute limit is handled by starting
+# the next segment shortly before the current one expires; the overlap is
+# recorded in the index so players/editors can trim it.
+RECORD_SEGMENT_SECONDS = 180 # screenrecord's maximum --time-limit
+RECORD_HANDOFF_SECONDS = 2 # Start the next segment this long before the current one ends
+RECORD_BIT_RATE = 8000000
+RECORD_BUFFER_CHUNKS = 64 # Bounded buffer between socket and disk (x 64 KB)
+RECORD_MARK_INTERVAL = 1.0 # Seconds between (time, byte offset) index marks
+RECORD_ERROR_TEXT_MAX = 4096 # A segment this small that isn't H.264 holds screenrecord's error message
+
+active_recorders = {} # serial -> ScreenRecorder
+
+class RecordingSegment:
+    """One screenrecord run streamed straight into one .h264 file."""
+
+    def __init__(self, serial, number, path):
+        self.serial = serial
+        self.number = number
+        self.path = path
+        self.buffer = queue.Queue(maxsize=RECORD_BUFFER_CHUNKS)
+        self.bytes_written = 0
+        self.marks = [] # [seconds since first byte, byte offset]
+        self.started_at = None # Wall clock of the first byte
+        self.ended_at = None
+        self.first_byte = threading.Event()
+        self.finished = threading.Event()
+        self.error = None
+        command = (f"exec:screenrecord --output-format=h264 --bit-rate {RECORD_BIT_RATE} "
+                   f"--time-limit {RECORD_SEGMENT_SECONDS} -")
+        self.sock = adb_server_connect(command, serial)
+        self.sock.settimeout(None)
+        threading.Thread(target=self._read, daemon=True).start()
+        threading.Thread(target=self._write, daemon=True).start()
+
+    def _read(self):
+        try:
+            while True:
+                chunk = self.sock.recv(65536)
+                if not chunk: break
+                if self.started_at is None:
+                    self.started_at = time.time()
+                    self.first_byte.set()
+                self.buffer.put(chunk) # Blocks when the disk falls behind, never grows unbounded
+        except OSError as e:
+            if self.sock.fileno() != -1: self.error = e # Not an error if we closed it ourselves
+        finally:
+            self.buffer.put(None)
+
+    def _write(self):
+        try:
+            with open(self.path, "wb") as out_file:
+                last_mark = None
+                while True:
+                    chunk = self.buffer.get()
+                    if chunk is None: break
+                    now = time.time()
+                    if last_mark is None or now - last_mark >= RECORD_MARK_INTERVAL:
+                        self.marks.append([round(now - self.started_at, 3), self.bytes_written])
+                        last_mark = now
+                    out_file.write(chunk)
+                    self.bytes_written += len(chunk)
+        except OSError as e:
+            self.error = e
+        finally:
+            self.ended_at = time.time()
+            try:
+                self.sock.close()
+            except OSError:
+                pass
+            self.finished.set()
+
+    def wait_started(self, timeout):
+        """Waits for the first byte. Returns False if the segment ended or timed out first."""
+        deadline = time.monotonic() + timeout
+        while not self.first_byte.is_set() and not self.finished.is_set() and time.monotonic() < deadline:
+            self.first_byte.wait(timeout=0.1)
+        return self.first_byte.is_set()
+
+    def output_error(self):
+        """
+        screenrecord's complaint when it produced no video, else None. Its messages
+        come down the same exec: stream as the video, so they end up in the file.
+        """
+        if self.bytes_written == 0:
+            return "screenrecord exited without output"
+        if self.bytes_written > RECORD_ERROR_TEXT_MAX:
+            return None
+        try:
+            with open(self.path, "rb") as f:
+                data = f.read()
+        except OSError:
+            return None
+        if data.startswith((b"\0\0\0\1", b"\0\0\1")): # H.264 start code
+            return None
+        return data.decode("utf-8", "replace").strip() or "screenrecord produced no video"
+
+    def stop(self):
+        try:
+            self.sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        self.sock.close()
+
+    def index_entry(self):
+        return {
+            "segment": self.number,
+            "file": os.path.basename(self.path),
+            "started_at": self.started_at,
+            "ended_at": self.ended_at,
+            "bytes": self.bytes_written,
+            "marks": self.marks,
+            "error": str(self.error) if self.error else None,
+        }
+
+class ScreenRecorder:
+    """Records one device into consecutive segments until stopped."""
+
+    def __init__(self, serial, out_dir):
+        self.serial = serial
+        self.base = os.path.join(out_dir, f"record_{serial.replace(':', '_')}_{time.strftime('%Y%m%d_%H%M%S')}")
+        self.index_path = self.base + ".index.jsonl"
+        self.index_lock = threading.Lock() # Segments are closed from more than one thread
+        self.stopping = threading.Event()
+        self.segments = []
+        self.overlap_supported = True
+        self.thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self.thread.start()
+
+    def stop(self):
+        self.stopping.set()
+        for segment in self.segments:
+            if not segment.finished.is_set(): segment.stop()
+
+    @property
+    def bytes_written(self):
+        return sum(segment.bytes_written for segment in self.segments)
+
+    def _new_segment(self):
+        segment = RecordingSegment(self.serial, len(self.segments), f"{self.base}_seg{len(self.segments):03d}.h264")
+        self.segments.append(segment)
+        return segment
+
+    def _close_segment(self, segment):
+        segment.finished.wait()
+        stopped_before_output = self.stopping.is_set() and segment.bytes_written == 0
+        failure = None if segment.error or stopped_before_output else segment.output_error()
+        if failure:
+            segment.error = failure
+        with self.index_lock:
+            with open(self.index_path, "a", encoding="utf-8") as index_file:
+                index_file.write(json.dumps(segment.index_entry()) + "\n")
+        if failure:
+            log_message(f"[ERROR] Recording {self.serial} failed (segment {segment.number}): {failure}", ERROR_COLOR)
+        elif segment.error:
+            log_message(f"[WARN] {self.serial}: segment {segment.number} ended with an error: {segment.error}", WARN_COLOR)
+
+    def _run(self):
+        log_message(f"[ OK ] Recording {self.serial} to {self.base}_seg*.h264", OK_COLOR)
+        try:
+            current = self._new_segment()
+            while not self.stopping.is_set():
+                if not current.wait_started(timeout=10):
+                    if current.finished.is_set() or self.stopping.is_set(): break
+                    continue
+                handoff_at = current.started_at + RECORD_SEGMENT_SECONDS - RECORD_HANDOFF_SECONDS
+                # Sleep until hand-off (or until the segment ends when overlap isn't possible),
+                # waking early if the segment ends or we're stopped
+                while not self.stopping.is_set() and not current.finished.is_set() and \
+                        (time.time() < handoff_at or not self.overlap_supported):
+                    current.finished.wait(timeout=min(0.5, max(handoff_at - time.time(), 0.1)))
+                if self.stopping.is_set(): break
+                if current.finished.is_set() and time.time() < handoff_at - 1:
+                    log_message(f"[WARN] {self.serial}: screenrecord stopped early (segment {current.number}).", WARN_COLOR)
+                    break
+
+                previous, current = current, self._new_segment()
+                if self.overlap_supported and not previous.finished.is_set():
+                    # Some devices allow only one encoder/virtual display at a time
+                    if not current.wait_started(timeout=RECORD_HANDOFF_SECONDS + 3) and current.finished.is_set():
+                        self.overlap_supported = False
+                        log_message(f"[INFO] {self.serial}: overlapping segments not supported, chaining back to back.", INFO_COLOR)
+                        self.segments.pop()
+                        current.finished.wait()
+                        os.remove(current.path)
+                        self._close_segment(previous)
+                        current = self._new_segment()
+                        continue
+                threading.Thread(target=self._close_segment, args=(previous,), daemon=True).start()
+        except (AdbServerError, OSError) as e:
+            log_message(f"[ERROR] Recording {self.serial} failed: {e}", ERROR_COLOR)
+        finally:
+            for segment in self.segments:
+                if not segment.finished.is_set(): segment.stop()
+            for segment in self.segments:
+                segment.finished.wait(timeout=10)
+            if self.segments:
+                self._close_segment(self.segments[-1])
+            active_recorders.pop(self.serial, None)
+            log_message(f"[ OK ] Recording {self.serial} stopped: {len(self.segments)} segment(s), "
+                        f"{_format_size(self.bytes_written)}. Index: {self.index_path}", OK_COLOR)
+
+def start_recording(serials, out_dir):
+    for serial in serials:
+        if serial in active_recorders:
+            log_message(f"[WARN] {serial} is already recording.", WARN_COLOR)
+            continue
+        recorder = active_recorders[serial] = ScreenRecorder(serial, out_dir)
+        recorder.start()
+
+def stop_recording(serials=None):
+    for serial in list(serials if serials is not None else active_recorders):
+        recorder = active_recorders.get(serial)
+        if recorder: recorder.stop()
+
+def open_screen_recorder():
+    """Window to record one or more devices in parallel."""
+    with_connected_devices(_screen_recorder_window, allow_empty=bool(active_recorders))
+
+def _screen_recorder_window(devices):
+    window = tk.Toplevel(root)
+    window.title("Screen Recorder")
+    window.geometry("620x360")
+    window.config(bg=DEFAULT_BACKGROUND_COLOR)
+
+    tree = ttk.Treeview(window, columns=("state", "segments", "size"), selectmode="extended")
+    tree.heading("#0", text="Device")
+    tree.heading("state", text="State")
+    tree.heading("segments", text="Segments")
+    tree.heading("size", text="Recorded")
+    tree.column("#0", width=200)
+    tree.column("state", width=120)
+    tree.column("segments", width=90, anchor="e")
+    tree.column("size", width=120, anchor="e")
+    tree.pack(expand=True, fill=tk.BOTH, padx=5, pady=5)
+    for serial in sorted(set(devices) | set(active_recorders)):
+        tree.insert("", tk.END, iid=serial, text=serial, values=("", "", ""))
+
+    def refresh():
+        if not tree.winfo_exists(): return
+        for serial in tree.get_children():
+            recorder = active_recorders.get(serial)
+            if recorder:
+                tree.item(serial, values=("Recording", len(recorder.segments), _format_size(recorder.bytes_written)))
+            else:
+                tree.item(serial, values=("Idle", "", ""))
+        window.after(1000, refresh)
+
+    def start():
+        serials = list(tree.selection())
+        if not serials:
+            log_message("[WARN] Select one or more devices to record.", WARN_COLOR)
+            return
+        out_dir = filedialog.askdirectory(title="Select Folder for Recordings (PC)", parent=window)
+        if not out_dir: return
+        start_recording(serials, out_dir)
+
+    button_bar = ttk.Frame(window, padding="5", style="TFrame")
+    button_bar.pack(fill=tk.X)
+    ttk.Button(button_bar, text="Start Selected", command=start, width=15).pack(side=tk.LEFT, padx=2)
+    ttk.Button(button_bar, text="Stop Selected", command=lambda: stop_recording(tree.selection()), width=15).pack(side=tk.LEFT, padx=2)
+    ttk.Button(button_bar, text="Stop All", command=stop_recording, width=10).pack(side=tk.LEFT, padx=2)
+    refresh()
+
+
+# --- APK Metadata (binary manifest + signing block) ---
+# Reads what's inside an APK without aapt: the binary AndroidManifest.xml
+# (package, versions, SDK levels), native ABIs from lib/<abi>/, and the
+# signer certificate digest from the APK Signing Block (v2/v3) or the v1
+# PKCS#7 signature. Results are cached by file content hash.
+APK_CACHE_FILE = os.path.join(APP_DATA_DIR, "apk_cache.json")
+APK_SIGNING_BLOCK_MAGIC = b"APK Sig Block 42"
+APK_SIGNATURE_SCHEME_IDS = (0x1B93AD61, 0xF05368C0, 0x7109871A) # v3.1, v3, v2 (preferred order)
+# android:* attribute resource IDs (names can be stripped by shrinkers, IDs can't)
+ANDROID_ATTR_IDS = {
+    0x0101021B: "versionCode",
+    0x0101021C: "versionName",
+    0x0101020C: "minSdkVersion",
+    0x01010270: "targetSdkVersion",
+}
+
+# AXML chunk types
+AXML_STRING_POOL = 0x0001
+AXML_RESOURCE_MAP = 0x0180
+AXML_START_ELEMENT = 0x0102
+
+apk_cache = None # {"by_hash": {sha256: info}, "by_path": {path: [size, mtime_ns, sha256]}}
+apk_cache_lock = threading.Lock()
+
+class ApkParseError(Exception):
+    """Raised when an APK or its manifest can't be parsed."""
+
+def _axml_string_pool(data, offset):
+    """Decodes a ResStringPool chunk into a list of strings."""
+    _, header_size, _, count, _, flags, strings_start, _ = struct.unpack_from("<HHIIIIII", data, offset)
+    is_utf8 = flags & 0x100
+    offsets = struct.unpack_from(f"<{count}I", data, offset + header_size)
+    base = offset + strings_start
+    strings = []
+    for string_offset in offsets:
+        pos = base + string_offset
+        if is_utf8:
+            pos += 2 if data[pos] & 0x80 else 1 # Length in UTF-16 units, unused
+            length = data[pos]
+            if length & 0x80:
+                length = ((length & 0x7F) << 8) | data[pos + 1]
+                pos += 1
+            pos += 1
+            strings.append(data[pos:pos + length].decode("utf-8", "replace"))
+        else:
+            length = struct.unpack_from("<H", data, pos)[0]
+            if length & 0x8000:
+                length = ((length & 0x7FFF) << 16) | struct.unpack_from("<H", data, pos + 2)[0]
+                pos += 2
+            pos += 2
+            strings.append(data[pos:pos + length * 2].decode("utf-16-le", "replace"))
+    return strings
+
+def parse_binary_xml(data):
+    """Yields (element name, {attribute name: value}) for every start tag of a binary XML file."""
+    if len(data) < 8 or struct.unpack_from("<H", data)[0] != 0x0003:
+        raise ApkParseError("Not a binary XML document.")
+    strings, resource_ids = [], []
+    offset = struct.unpack_from("<H", data, 2)[0]
+    while offset + 8 <= len(data):
+        chunk_type, header_size, chunk_size = struct.unpack_from("<HHI", data, offset)
+        if chunk_size < 8:
+            raise ApkParseError("Corrupt binary XML chunk.")
+        if chunk_type == AXML_STRING_POOL:
+            strings = _axml_string_pool(data, offset)
+        elif chunk_type == AXML_RESOURCE_MAP:
+            resource_ids = struct.unpack_from(f"<{(chunk_size - header_size) // 4}I", data, offset + header_size)
+        elif chunk_type == AXML_START_ELEMENT:
+            name_index, attr_start, attr_size, attr_count = struct.unpack_from("<4xIHHH", data, offset + header_size)
+            attributes = {}
+            pos = offset + header_size + attr_start
+            for _ in range(attr_count):
+                _, attr_name, raw_value, _, value_type, value = struct.unpack_from("<IIIHxBI", data, pos)
+                pos += attr_size
+                # Prefer the android: resource ID, fall back to the (possibly obfuscated) name
+                name = ANDROID_ATTR_IDS.get(resource_ids[attr_name] if attr_name < len(resource_ids) else None) \
+                    or (strings[attr_name] if attr_name < len(strings) else "")
+                if value_type == 0x03: # String
+                    attributes[name] = strings[value] if value < len(strings) else ""
+                elif value_type in (0x10, 0x11): # Decimal / hex integer
+                    attributes[name] = value
+                elif value_type == 0x12: # Boolean
+                    attributes[name] = value != 0
+                elif value_type == 0x01: # Resource reference
+                    attributes[name] = f"@0x{value:08x}"
+                else:
+                    attributes[name] = strings[raw_value] if raw_value < len(strings) else value
+            yield strings[name_index] if name_index < len(strings) else "", attributes
+        offset += chunk_size
+
+def _length_prefixed(data, offset):
+    """Reads a uint32-length-prefixed blob. Returns (blob, next offset)."""
+    length = struct.unpack_from("<I", data, offset)[0]
+    return data[offset + 4:offset + 4 + length], offset + 4 + length
+
+def _apk_signing_block(apk_file):
+    """Returns {block id: value} from the APK Signing Block, or {} for v1-only APKs."""
+    apk_file.seek(0, os.SEEK_END)
+    file_size = apk_file.tell()
+    tail_size = min(file_size, 65535 + 22)
+    apk_file.seek(file_size - tail_size)
+    tail = apk_file.read(tail_size)
+    eocd = tail.rfind(b"PK\x05\x06")
+    if eocd == -1:
+        raise ApkParseError("ZIP end of central directory not found.")
+    central_dir_offset = struct.unpack_from("<I", tail, eocd + 16)[0]
+    if central_dir_offset < 32:
+        return {}
+    apk_file.seek(central_dir_offset - 24)
+    footer = apk_file.read(24)
+    if footer[8:] != APK_SIGNING_BLOCK_MAGIC:
+        return {}
+    block_size = struct.unpack_from("<Q", footer)[0]
+    apk_file.seek(central_dir_offset - block_size - 8)
+    block = apk_file.read(block_size - 16) # Skip leading size, stop before trailing size + magic
+    pairs, offset = {}, 8
+    while offset + 12 <= len(block):
+        pair_length, pair_id = struct.unpack_from("<QI", block, offset)
+        pairs[pair_id] = block[offset + 12:offset + 8 + pair_length]
+        offset += 8 + pair_length
+    return pairs
+
+def _first_v2_certificate(scheme_value):
+    """First signer's first certificate (DER) from a v2/v3 signature scheme block."""
+    signers, _ = _length_prefixed(scheme_value, 0)
+    signer, _ = _length_prefixed(signers, 0)
+    signed_data, _ = _length_prefixed(signer, 0)
+    _, offset = _length_prefixed(signed_data, 0) # Digests
+    certificates, _ = _length_prefixed(signed_data, offset)
+    certificate, _ = _length_prefixed(certificates, 0)
+    return certificate
+
+def _der_element(data, offset):
+    """Returns (tag, content start, content end) of the DER element at `offset`."""
+    tag, length = data[offset], data[offset + 1]
+    offset += 2
+    if length & 0x80:
+        byte_count = length & 0x7F
+        length = int.from_bytes(data[offset:offset + byte_count], "big")
+        offset += byte_count
+    return tag, offset, offset + length
+
+def _first_pkcs7_certificate(pkcs7):
+    """First certificate (DER) from a v1 PKCS#7 SignedData signature file (META-INF/*.RSA etc.)."""
+    _, start, _ = _der_element(pkcs7, 0) # ContentInfo SEQUENCE
+    _, oid_start, oid_end = _der_element(pkcs7, start) # contentType OID
+    _, explicit_start, _ = _der_element(pkcs7, oid_end) # [0] EXPLICIT
+    _, pos, signed_data_end = _der_element(pkcs7, explicit_start) # SignedData SEQUENCE
+    while pos < signed_data_end:
+        tag, content_start, content_end = _der_element(pkcs7, pos)
+        if tag == 0xA0: # certificates [0] IMPLICIT
+            _, _, cert_end = _der_element(pkcs7, content_start)
+            return pkcs7[content_start:cert_end]
+        pos = content_end
+    raise ApkParseError("No certificate in v1 signature.")
+
+def _apk_signer_digest(apk_path, apk_zip):
+    """Returns ("v2"/"v3"/"v1", SHA-256 of the signer certificate) or (None, None) if unsigned."""
+    with open(apk_path, "rb") as apk_file:
+        pairs = _apk_signing_block(apk_file)
+    for scheme_id in APK_SIGNATURE_SCHEME_IDS:
+        if scheme_id in pairs:
+            scheme = "v2" if scheme_id == 0x7109871A else "v3"
+            return scheme, hashlib.sha256(_first_v2_certificate(pairs[scheme_id])).hexdigest()
+    for name in apk_zip.namelist():
+        if name.startswith("META-INF/") and name.upper().endswith((".RSA", ".DSA", ".EC")):
+            return "v1", hashlib.sha256(_first_pkcs7_certificate(apk_zip.read(name))).hexdigest()
+    return None, None
+
+def parse_apk(apk_path):
+    """Extracts package metadata from an APK (no caching). Raises ApkParseError."""
+    try:
+        with zipfile.ZipFile(apk_path) as apk_zip:
+            try:
+                manifest = apk_zip.read("AndroidManifest.xml")
+            except KeyError:
+                raise ApkParseError("AndroidManifest.xml not found.")
+            info = {"package": None, "version_code": None, "version_name": None, "min_sdk": None, "target_sdk": None}
+            for element, attributes in parse_binary_xml(manifest):
+                if element == "manifest":
+                    info["package"] = attributes.get("package")
+                    info["version_code"] = attributes.get("versionCode")
+                    info["version_name"] = attributes.get("versionName")
+                elif element == "uses-sdk":
+                    info["min_sdk"] = attributes.get("minSdkVersion")
+                    info["target_sdk"] = attributes.get("targetSdkVersion")
+                    break # Everything we need comes before <application>
+            info["abis"] = sorted({name.split("/")[1] for name in apk_zip.namelist()
+                                   if name.startswith("lib/") and name.count("/") >= 2})
+            info["signature_scheme"], info["signer_sha256"] = _apk_signer_digest(apk_path, apk_zip)
+            return info
+    except (zipfile.BadZipFile, struct.error, IndexError, ValueError) as e:
+        raise ApkParseError(f"Malformed APK: {e}")
+
+def _file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as source:
+        for block in iter(lambda: source.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def _load_apk_cache():
+    global apk_cache
+    if apk_cache is None:
+        try:
+            with open(APK_CACHE_FILE, encoding="utf-8") as cache_file:
+                apk_cache = json.load(cache_file)
+        except (OSError, ValueError):
+            apk_cache = {}
+        apk_cache.setdefault("by_hash", {})
+        apk_cache.setdefault("by_path", {})
+    return apk_cache
+
+def save_apk_cache():
+    with apk_cache_lock:
+        if apk_cache is None: return
+        data = json.dumps(apk_cache)
+    try:
+        os.makedirs(APP_DATA_DIR, exist_ok=True)
+        with open(APK_CACHE_FILE, "w", encoding="utf-8") as cache_file:
+            cache_file.write(data)
+    except OSError as e:
+        log_message(f"[WARN] Could not save APK cache: {e}", WARN_COLOR)
+
+def get_apk_info(apk_path, save=True):
+    """
+    Returns parse_apk() output plus "sha256", cached by content hash.
+    A (size, mtime) check per path avoids re-hashing unchanged files.
+    """
+    apk_path = os.path.abspath(apk_path)
+    file_stat = os.stat(apk_path)
+    with apk_cache_lock:
+        cache = _load_apk_cache()
+        known = cache["by_path"].get(apk_path)
+        if known and known[0] == file_stat.st_size and known[1] == file_stat.st_mtime_ns and known[2] in cache["by_hash"]:
+            return dict(cache["by_hash"][known[2]], sha256=known[2])
+    sha256 = _file_sha256(apk_path)
+    with apk_cache_lock:
+        info = cache["by_hash"].get(sha256)
+    if info is None:
+        info = parse_apk(apk_path)
+    with apk_cache_lock:
+        cache["by_hash"][sha256] = info
+        cache["by_path"][apk_path] = [file_stat.st_size, file_stat.st_mtime_ns, sha256]
+    if save: save_apk_cache()
+    return dict(info, sha256=sha256)
+
+def describe_apk(info):
+    return (f"{info['package']} v{info['version_name']} ({info['version_code']}), "
+            f"minSdk {info['min_sdk']}, targetSdk {info['target_sdk']}, "
+            f"ABIs: {', '.join(info['abis']) or 'any'}, "
+            f"signer ({info['signature_scheme'] or 'unsigned'}): {(info['signer_sha256'] or '-')[:16]}")
+
+def is_apk_installed_identical(package, sha256, serial=None):
+    """True if the device's installed base.apk for `package` has exactly this content hash."""
+    device = ["-s", serial] if serial else []
+    stdout, _, retcode = run_adb_command(device + ["shell", "pm", "path", package], display_output=False,
+                                         command_name="Check Installed Package", sync=True)
+    paths = [line[8:].strip() for line in stdout.splitlines() if line.startswith("package:")]
+    base = next((p for p in paths if p.endswith("/base.apk")), paths[0] if paths else None)
+    if retcode != 0 or not base:
+        return False
+    stdout, _, retcode = run_adb_command(device + ["shell", "sha256sum", base], display_output=False,
+                                         command_name="Hash Installed APK", sync=True)
+    return retcode == 0 and stdout.split()[:1] == [sha256]
+
+def scan_apk_folder():
+    """Parses every APK under a folder (using the cache) and logs a summary line per APK."""
+    folder = filedialog.askdirectory(title="Select Folder with APKs (PC)")
+    if not folder: return
+
+    def scan():
+        started = time.monotonic()
+        apk_paths = [os.path.join(d, f) for d, _, files in os.walk(folder) for f in files if f.lower().endswith(".apk")]
+        log_message(f"\n[EXEC] Scanning {len(apk_paths)} APK(s) in {folder}", EXEC_COLOR)
+        for apk_path in sorted(apk_paths):
+            try:
+                log_message(f"{os.path.relpath(apk_path, folder)}: {describe_apk(get_apk_info(apk_path, save=False))}")
+            except (ApkParseError, OSError) as e:
+                log_message(f"[WARN] {os.path.relpath(apk_path, folder)}: {e}", WARN_COLOR)
+        save_apk_cache()
+        log_message(f"[ OK ] Scanned {len(apk_paths)} APK(s) in {time.monotonic() - started:.2f}s.", OK_COLOR)
+        log_message("", tag_color=None)
+
+    command_scheduler.submit(scan, PRIORITY_NORMAL, label="Scan APK folder")
+
+
+# --- Process Viewer ---
+# One persistent, non-interactive shell per window (exec:sh) samples
+# /proc/*/stat every tick. The table is virtualized: the Treeview only has
+# as many rows as fit on screen and each tick rewrites only the visible
+# rows whose values changed, so 800+ processes cost the same as 30.
+PROCESS_SAMPLE_INTERVAL = 1.5 # Seconds between samples
+PROCESS_SAMPLE_END = b"__ADBH_END__"
+PROCESS_SAMPLE_COMMAND = (b"head -n 1 /proc/stat; cat /proc/[0-9]*/stat 2>/dev/null; echo " + PROCESS_SAMPLE_END + b"\n")
+PROCESS_VISIBLE_ROWS = 30
+PROCESS_COLUMNS = ("pid", "name", "state", "cpu", "rss", "ppid")
+
+class ProcessSampler:
+    """Persistent device shell that returns parsed /proc samples."""
+
+    def __init__(self, serial):
+        self.serial = serial
+        self.sock = adb_server_connect("exec:sh", serial)
+        self.sock.settimeout(15)
+        self.pending = b""
+        self.page_size = 4096
+        page_size = self._run(b"getconf PAGESIZE 2>/dev/null; echo " + PROCESS_SAMPLE_END + b"\n").strip()
+        if page_size.isdigit():
+            self.page_size = int(page_size)
+        self.previous = None # (total jiffies, {pid: jiffies})
+
+    def _run(self, command):
+        self.sock.sendall(command)
+        while PROCESS_SAMPLE_END + b"\n" not in self.pending:
+            chunk = self.sock.recv(262144)
+            if not chunk:
+                raise AdbServerError("Device shell closed.")
+            self.pending += chunk
+        output, self.pending = self.pending.split(PROCESS_SAMPLE_END + b"\n", 1)
+        return output
+
+    def sample(self):
+        """Returns {pid: (pid, name, state, cpu_percent, rss_bytes, ppid)}."""
+        lines = self._run(PROCESS_SAMPLE_COMMAND).decode("utf-8", "replace").splitlines()
+        if not lines or not lines[0].startswith("cpu "):
+            raise AdbServerError("Unexpected /proc/stat output.")
+        total = sum(int(v) for v in lines[0].split()[1:])
+        jiffies, rows = {}, {}
+        previous_total, previous_jiffies = self.previous or (total, {})
+        total_delta = max(total - previous_total, 1)
+        for line in lines[1:]:
+            open_paren, close_paren = line.find("("), line.rfind(")")
+            if open_paren == -1 or close_paren == -1:
+                continue
+            fields = line[close_paren + 2:].split()
+            if len(fields) < 22:
+                continue
+            pid = int(line[:open_paren])
+            used = int(fields[11]) + int(fields[12]) # utime + stime
+            jiffies[pid] = used
+            cpu = 100.0 * (used - previous_jiffies[pid]) / total_delta if pid in previous_jiffies else 0.0
+            rows[pid] = (pid, line[open_paren + 1:close_paren], fields[0], round(cpu, 1),
+                         int(fields[21]) * self.page_size, int(fields[1]))
+        self.previous = (total, jiffies)
+        return rows
+
+    def close(self):
+        try:
+            self.sock.sendall(b"exit\n")
+        except OSError:
+            pass
+        self.sock.close()
+
+def open_process_viewer():
+    """Opens a live process table for one device (open several windows for several devices)."""
+    with_connected_devices(_process_viewer_window)
+
+def _process_viewer_window(devices):
+    window = tk.Toplevel(root)
+    window.title("Processes")
+    window.geometry("760x640")
+    window.config(bg=DEFAULT_BACKGROUND_COLOR)
+
+    top_bar = ttk.Frame(window, padding="5", style="TFrame")
+    top_bar.pack(fill=tk.X)
+    ttk.Label(top_bar, text="Device").pack(side=tk.LEFT, padx=(0, 5))
+    serial_var = tk.StringVar(value=devices[0])
+    serial_box = ttk.Combobox(top_bar, textvariable=serial_var, values=devices, width=22, state="readonly")
+    serial_box.pack(side=tk.LEFT)
+    ttk.Label(top_bar, text="Filter").pack(side=tk.LEFT, padx=(10, 5))
+    filter_entry = ttk.Entry(top_bar, width=20)
+    filter_entry.pack(side=tk.LEFT)
+
+    body = ttk.Frame(window, style="TFrame")
+    body.pack(expand=True, fill=tk.BOTH, padx=5)
+    tree = ttk.Treeview(body, columns=PROCESS_COLUMNS, show="headings", height=PROCESS_VISIBLE_ROWS, selectmode="browse")
+    headings = {"pid": ("PID", 70), "name": ("Name", 260), "state": ("S", 40), "cpu": ("CPU %", 80),
+                "rss": ("RSS", 100), "ppid": ("PPID", 70)}
+    for column in PROCESS_COLUMNS:
+        title, width = headings[column]
+        tree.heading(column, text=title, command=lambda c=column: sort_by(c))
+        tree.column(column, width=width, anchor="w" if column == "name" else "e")
+    scrollbar = ttk.Scrollbar(body, orient=tk.VERTICAL)
+    scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+    tree.pack(expand=True, fill=tk.BOTH)
+    slots = [tree.insert("", tk.END, iid=f"slot{i}", values=()) for i in range(PROCESS_VISIBLE_ROWS)]
+    status_var = tk.StringVar(value="Connecting...")
+    ttk.Label(window, textvariable=status_var).pack(fill=tk.X, padx=5)
+
+    state = {"rows": {}, "order": [], "top": 0, "sort": "cpu", "reverse": True, "selected_pid": None, "sampler": None,
+             "generation": 0}
+    slot_values = [None] * PROCESS_VISIBLE_ROWS # What each slot currently shows
+
+    def display_row(row):
+        pid, name, proc_state, cpu, rss, ppid = row
+        return (pid, name, proc_state, f"{cpu:.1f}", _format_size(rss), ppid)
+
+    def reorder():
+        text = filter_entry.get().strip().lower()
+        rows = [r for r in state["rows"].values() if not text or text in r[1].lower() or text == str(r[0])]
+        column = PROCESS_COLUMNS.index(state["sort"])
+        rows.sort(key=lambda r: r[column], reverse=state["reverse"])
+        state["order"] = rows
+
+    def render():
+        rows = state["order"]
+        state["top"] = max(0, min(state["top"], len(rows) - PROCESS_VISIBLE_ROWS))
+        for i, slot in enumerate(slots):
+            index = state["top"] + i
+            values = display_row(rows[index]) if index < len(rows) else ()
+            if values != slot_values[i]: # Only touch rows that changed
+                tree.item(slot, values=values)
+                slot_values[i] = values
+        selected = next((slot for i, slot in enumerate(slots)
+                         if slot_values[i] and slot_values[i][0] == state["selected_pid"]), None)
+        if selected:
+            if tree.selection() != (selected,): tree.selection_set(selected)
+        elif tree.selection():
+            tree.selection_remove(tree.selection())
+        total = max(len(rows), 1)
+        scrollbar.set(state["top"] / total, min((state["top"] + PROCESS_VISIBLE_ROWS) / total, 1.0))
+
+    def scroll_command(action, amount, unit=None):
+        if action == "moveto":
+            state["top"] = int(float(amount) * len(state["order"]))
+        elif action == "scroll":
+            state["top"] += int(amount) * (PROCESS_VISIBLE_ROWS if unit == "pages" else 1)
+        render()
+
+    def scroll_lines(amount):
+        state["top"] += amount
+        render()
+        return "break"
+
+    def sort_by(column):
+        state["reverse"] = not state["reverse"] if state["sort"] == column else column in ("cpu", "rss")
+        state["sort"] = column
+        reorder()
+        render()
+
+    def on_select(event):
+        selection = tree.selection()
+        if selection:
+            values = slot_values[slots.index(selection[0])]
+            state["selected_pid"] = values[0] if values else None
+
+    def sample_loop(serial, generation):
+        sampler = None
+        try:
+            sampler = state["sampler"] = ProcessSampler(serial)
+            while generation == state["generation"]:
+                started = time.monotonic()
+                rows = sampler.sample()
+                elapsed = time.monotonic() - started
+                def apply(rows=rows, elapsed=elapsed):
+                    if not window.winfo_exists() or generation != state["generation"]: return
+                    state["rows"] = rows
+                    reorder()
+                    render()
+                    status_var.set(f"{serial}: {len(rows)} processes, sample took {elapsed * 1000:.0f} ms")
+                root.after(0, apply)
+                time.sleep(max(PROCESS_SAMPLE_INTERVAL - elapsed, 0.1))
+        except (AdbServerError, OSError) as e:
+            if generation == state["generation"]:
+                message = f"{serial}: sampling stopped ({e})"
+                root.after(0, lambda: window.winfo_exists() and status_var.set(message))
+        finally:
+            if sampler: sampler.close()
+
+    def start_sampling(event=None):
+        state["generation"] += 1
+        state["rows"], state["order"], state["top"] = {}, [], 0
+        render()
+        threading.Thread(target=sample_loop, args=(serial_var.get(), state["generation"]), daemon=True).start()
+
+    def selected_process():
+        pid = state["selected_pid"]
+        if pid is None or pid not in state["rows"]:
+            log_message("[WARN] Select a process first.", WARN_COLOR)
+            return None
+        return state["rows"][pid]
+
+    def kill_process():
+        row = selected_process()
+        if row and messagebox.askyesno("Confirm Kill", f"Kill {row[1]} (PID {row[0]})?", parent=window):
+            run_adb_command(["-s", serial_var.get(), "shell", "kill", str(row[0])], command_name=f"Kill {row[1]}")
+
+    def force_stop_process():
+        row = selected_process()
+        if not row: return
+        serial = serial_var.get()
+        def lookup():
+            # comm is truncated to 15 chars; the package name is the process cmdline up to ':'
+            stdout, _, _ = run_adb_command(["-s", serial, "shell", "cat", f"/proc/{row[0]}/cmdline"],
+                                           display_output=False, command_name="Read Process Name", sync=True)
+            package = stdout.split("\0")[0].split(":")[0].strip() or row[1]
+            def stop():
+                package_name_entry.delete(0, tk.END)
+                package_name_entry.insert(0, package)
+                force_stop_app(serial)
+            root.after(0, stop)
+        command_scheduler.submit(lookup, PRIORITY_INTERACTIVE, serial, f"Force stop PID {row[0]}")
+
+    def on_close():
+        state["generation"] += 1 # Stops the sampler thread
+        window.destroy()
+
+    scrollbar.configure(command=scroll_command)
+    tree.bind("<<TreeviewSelect>>", on_select)
+    tree.bind("<MouseWheel>", lambda e: scroll_lines(-3 if e.delta > 0 else 3))
+    tree.bind("<Button-4>", lambda e: scroll_lines(-3))
+    tree.bind("<Button-5>", lambda e: scroll_lines(3))
+    filter_entry.bind("<KeyRelease>", lambda e: (reorder(), render()))
+    serial_box.bind("<<ComboboxSelected>>", start_sampling)
+    window.protocol("WM_DELETE_WINDOW", on_close)
+
+    button_bar = ttk.Frame(window, padding="5", style="TFrame")
+    button_bar.pack(fill=tk.X)
+    ttk.Button(button_bar, text="Kill", command=kill_process, width=12).pack(side=tk.LEFT, padx=2)
+    ttk.Button(button_bar, text="Force Stop", command=force_stop_process, width=12).pack(side=tk.LEFT, padx=2)
+    start_sampling()
+
+
+# --- Session Journal ---
+# Every logged message is appended to a per-session binary journal:
+#   file   = b"ADBJ" + version byte, then blocks
+#   block  = header (magic, compressed size, record count, first/last time,
+#            command-list size) + "\n"-joined command names + zlib payload
+#   record = <dHHHI (time, device/command/color/text lengths) + UTF-8 fields
+# Block headers alone give a time and command index, so the viewer can seek
+# without decompressing anything it does not show.
+JOURNAL_DIR = os.path.join(APP_DATA_DIR, "journal")
+JOURNAL_MAGIC = b"ADBJ\x01"
+JOURNAL_BLOCK_MAGIC = b"BLK1"
+JOURNAL_BLOCK_HEADER = struct.Struct("<4sIIddH")
+JOURNAL_RECORD = struct.Struct("<dHHHI")
+JOURNAL_BLOCK_RECORDS = 512 # Flush a block after this many records...
+JOURNAL_BLOCK_BYTES = 256 * 1024 # ...or this much uncompressed text...
+JOURNAL_FLUSH_INTERVAL = 5 # ...or this many seconds
+JOURNAL_RETENTION_DAYS = 60
+JOURNAL_VIEW_BLOCKS = 4 # Blocks rendered per page in the viewer
+
+journal_context = threading.local() # .device/.command of the command logging on this thread
+session_journal = None
+
+@contextlib.contextmanager
+def journal_scope(device, command):
+    """Tags messages logged on this thread with a device and command name."""
+    previous = getattr(journal_context, "device", ""), getattr(journal_context, "command", "")
+    journal_context.device, journal_context.command = device or "", command or ""
+    try:
+        yield
+    finally:
+        journal_context.device, journal_context.command = previous
+
+def _journal_field(text, limit=0xFFFF):
+    data = (text or "").encode("utf-8", "replace")
+    return data[:limit]
+
+class SessionJournal:
+    """Appends log records to a block-compressed journal file."""
+
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        self.file = None
+        self.pending = []
+        self.pending_bytes = 0
+        self.first_time = self.last_time = 0.0
+        self.commands = set()
+        self.stop_event = threading.Event()
+        self.thread = threading.Thread(target=self._flush_loop, daemon=True)
+        self.thread.start()
+
+    def record(self, message, color=None):
+        if self.stop_event.is_set(): return
+        now = time.time()
+        device = _journal_field(getattr(journal_context, "device", ""))
+        command = _journal_field(getattr(journal_context, "command", ""))
+        color = _journal_field(color)
+        text = _journal_field(message, 0xFFFFFFFF)
+        with self.lock:
+            if not self.pending:
+                self.first_time = now
+            self.last_time = now
+            self.pending.append(JOURNAL_RECORD.pack(now, len(device), len(command), len(color), len(text)) +
+                                device + command + color + text)
+            self.pending_bytes += len(text)
+            if command:
+                self.commands.add(command)
+            if len(self.pending) >= JOURNAL_BLOCK_RECORDS or self.pending_bytes >= JOURNAL_BLOCK_BYTES:
+                self._write_block()
+
+    def _write_block(self):
+        """Compresses and appends the pending records. Caller holds the lock."""
+        if not self.pending: return
+        payload = zlib.compress(b"".join(self.pending), 6)
+        commands = b"\n".join(sorted(self.commands))[:0xFFFF]
+        try:
+            if self.file is None:
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+                self.file = open(self.path, "ab")
+                if self.file.tell() == 0:
+                    self.file.write(JOURNAL_MAGIC)
+            self.file.write(JOURNAL_BLOCK_HEADER.pack(JOURNAL_BLOCK_MAGIC, len(payload), len(self.pending),
+                                                      self.first_time, self.last_time, len(commands)))
+            self.file.write(commands)
+            self.file.write(payload)
+            self.file.flush()
+        except OSError as e:
+            print(f"Error writing session journal: {e}") # log_message would recurse into the journal
+        self.pending, self.pending_bytes, self.commands = [], 0, set()
+
+    def flush(self):
+        with self.lock:
+            self._write_block()
+
+    def _flush_loop(self):
+        while not self.stop_event.wait(JOURNAL_FLUSH_INTERVAL):
+            self.flush()
+
+    def close(self):
+        self.stop_event.set()
+        with self.lock:
+            self._write_block()
+            if self.file:
+                self.file.close()
+                self.file = None
+
+def start_session_journal():
+    """Starts this session's journal and drops journals older than the retention period."""
+    global session_journal
+    cutoff = time.time() - JOURNAL_RETENTION_DAYS * 86400
+    try:
+        for name in os.listdir(JOURNAL_DIR):
+            path = os.path.join(JOURNAL_DIR, name)
+            if name.endswith(".adbj") and os.path.getmtime(path) < cutoff:
+                os.remove(path)
+    except OSError:
+        pass # No journal directory yet
+    session_journal = SessionJournal(os.path.join(JOURNAL_DIR, time.strftime("session_%Y%m%d_%H%M%S.adbj")))
+
+class JournalReader:
+    """Block index over a journal file; blocks are decompressed on demand."""
+
+    def __init__(self, path):
+        self.path = path
+        self.blocks = [] # (payload offset, compressed size, records, first time, last time, commands)
+        self.cache = collections.OrderedDict()
+        with open(path, "rb") as f:
+            if f.read(len(JOURNAL_MAGIC)) != JOURNAL_MAGIC:
+                raise ValueError("Not an ADB Helper session journal.")
+            size = os.fstat(f.fileno()).st_size
+            while True:
+                header = f.read(JOURNAL_BLOCK_HEADER.size)
+                if len(header) < JOURNAL_BLOCK_HEADER.size:
+                    break
+                magic, compressed, count, first, last, commands_size = JOURNAL_BLOCK_HEADER.unpack(header)
+                if magic != JOURNAL_BLOCK_MAGIC:
+                    break
+                commands = f.read(commands_size).decode("utf-8", "replace")
+                offset = f.tell()
+                if offset + compressed > size:
+                    break # Block cut short by a crash; everything before it is intact
+                self.blocks.append((offset, compressed, count, first, last, set(filter(None, commands.split("\n")))))
+                f.seek(compressed, os.SEEK_CUR)
+        self.last_times = [block[4] for block in self.blocks]
+
+    @property
+    def record_count(self):
+        return sum(block[2] for block in self.blocks)
+
+    def commands(self):
+        return sorted(set().union(*(block[5] for block in self.blocks)))
+
+    def read_block(self, index):
+        """Returns [(time, device, command, color, text)] for one block."""
+        if index in self.cache:
+            self.cache.move_to_end(index)
+            return self.cache[index]
+        offset, compressed = self.blocks[index][:2]
+        with open(self.path, "rb") as f:
+            f.seek(offset)
+            data = zlib.decompress(f.read(compressed))
+        records, position = [], 0
+        while position < len(data):
+            timestamp, *lengths = JOURNAL_RECORD.unpack_from(data, position)
+            position += JOURNAL_RECORD.size
+            fields = []
+            for length in lengths:
+                fields.append(data[position:position + length].decode("utf-8", "replace"))
+                position += length
+            records.append((timestamp, *fields))
+        self.cache[index] = records
+        if len(self.cache) > JOURNAL_VIEW_BLOCKS * 2:
+            self.cache.popitem(last=False)
+        return records
+
+    def block_at_time(self, timestamp):
+        """First block that ends at or after `timestamp`."""
+        return min(bisect.bisect_left(self.last_times, timestamp), max(len(self.blocks) - 1, 0))
+
+    def find_command(self, command, start_block):
+        """Next block at or after `start_block` that logged `command`, or None."""
+        return next((i for i in range(start_block, len(self.blocks)) if command in self.blocks[i][5]), None)
+
+def open_journal_viewer(path=None):
+    """Opens a session journal, loading only the blocks on the current page."""
+    if path is None:
+        if session_journal:
+            session_journal.flush() # Make the running session readable too
+        path = filedialog.askopenfilename(title="Open Session Journal", initialdir=JOURNAL_DIR if os.path.isdir(JOURNAL_DIR) else None,
+                                          filetypes=[("Session journals", "*.adbj"), ("All files", "*.*")])
+        if not path: return
+    try:
+        reader = JournalReader(path)
+    except (OSError, ValueError) as e:
+        log_message(f"[ERROR] Could not open journal {path}: {e}", ERROR_COLOR)
+        return
+
+    window = tk.Toplevel(root)
+    window.title(f"Session Journal - {os.path.basename(path)}")
+    window.geometry("1000x650")
+    window.config(bg=DEFAULT_BACKGROUND_COLOR)
+
+    seek_bar = ttk.Frame(window, padding="5", style="TFrame")
+    seek_bar.pack(fill=tk.X)
+    ttk.Label(seek_bar, text="Time (YYYY-MM-DD HH:MM[:SS] or HH:MM[:SS])").pack(side=tk.LEFT)
+    time_entry = ttk.Entry(seek_bar, width=20)
+    time_entry.pack(side=tk.LEFT, padx=5)
+    ttk.Label(seek_bar, text="Command").pack(side=tk.LEFT, padx=(10, 0))
+    command_var = tk.StringVar()
+    ttk.Combobox(seek_bar, textvariable=command_var, values=reader.commands(), width=28).pack(side=tk.LEFT, padx=5)
+
+    body = ttk.Frame(window, style="TFrame")
+    body.pack(expand=True, fill=tk.BOTH, padx=5)
+    view = tk.Text(body, wrap=tk.WORD, bg=TEXT_AREA_BG, fg=TEXT_AREA_FG, font=output_font, relief=tk.FLAT, state=tk.DISABLED)
+    view.tag_config("meta", foreground="#808080")
+    view.tag_config("highlight", background="#44475A")
+    scrollbar = ttk.Scrollbar(body, orient=tk.VERTICAL, command=view.yview)
+    scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+    view.config(yscrollcommand=scrollbar.set)
+    view.pack(expand=True, fill=tk.BOTH)
+    status_var = tk.StringVar()
+    ttk.Label(window, textvariable=status_var).pack(fill=tk.X, padx=5)
+
+    state = {"page": 0, "match": None} # match: (block, record index) of the highlighted command search hit
+
+    def show_page(first_block, focus=None, match=None):
+        """
+        Renders blocks [first_block, first_block + JOURNAL_VIEW_BLOCKS) and scrolls to
+        the record at `match` (block, index), or else the first record `focus` accepts.
+        """
+        if not reader.blocks:
+            status_var.set("Journal is empty.")
+            return
+        first_block = max(0, min(first_block, len(reader.blocks) - 1))
+        state["page"] = first_block
+        state["match"] = match
+        last_block = min(first_block + JOURNAL_VIEW_BLOCKS, len(reader.blocks))
+        view.config(state=tk.NORMAL)
+        view.delete("1.0", tk.END)
+        focus_line = None
+        for block in range(first_block, last_block):
+            for index, record in enumerate(reader.read_block(block)):
+                timestamp, device, command, color, text = record
+                if focus_line is None and (match == (block, index) if match else focus and focus(record)):
+                    focus_line = view.index("end-1c")
+                meta = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(timestamp))
+                if device: meta += f" [{device}]"
+                view.insert(tk.END, meta + " ", "meta")
+                tags = ()
+                if color:
+                    tags = (f"color_{color.replace('#', '')}",)
+                    view.tag_config(tags[0], foreground=color)
+                view.insert(tk.END, text.lstrip("\n") + "\n", tags)
+        if focus_line:
+            view.tag_add("highlight", focus_line, f"{focus_line} lineend")
+            view.see(focus_line)
+        view.config(state=tk.DISABLED)
+        start = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(reader.blocks[first_block][3]))
+        end = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(reader.blocks[last_block - 1][4]))
+        status_var.set(f"Blocks {first_block + 1}-{last_block} of {len(reader.blocks)} ({start} to {end}), "
+                       f"{reader.record_count:,} records total")
+
+    def seek_time(event=None):
+        text = time_entry.get().strip()
+        if not text or not reader.blocks: return
+        day = time.strftime("%Y-%m-%d", time.localtime(reader.blocks[state["page"]][3]))
+        for candidate, pattern in ((text, "%Y-%m-%d %H:%M:%S"), (text, "%Y-%m-%d %H:%M"),
+                                   (f"{day} {text}", "%Y-%m-%d %H:%M:%S"), (f"{day} {text}", "%Y-%m-%d %H:%M")):
+            try:
+                target = time.mktime(time.strptime(candidate, pattern))
+                break
+            except ValueError:
+                continue
+        else:
+            status_var.set(f"Unrecognized time: {text}")
+            return
+        show_page(reader.block_at_time(target), focus=lambda record: record[0] >= target)
+
+    def find_command(block=0, index=-1):
+        """Highlights the first record of the chosen command after record `index` of `block`."""
+        command = command_var.get().strip()
+        if not command: return
+        while True:
+            block = reader.find_command(command, block)
+            if block is None:
+                status_var.set(f"No more entries for '{command}'.")
+                return
+            records = reader.read_block(block)
+            hit = next((i for i in range(index + 1, len(records)) if records[i][2] == command), None)
+            if hit is not None:
+                break
+            block, index = block + 1, -1 # Rest of this block has none; move on to the next block
+        page = state["page"]
+        on_page = page <= block < page + JOURNAL_VIEW_BLOCKS
+        show_page(page if on_page else block, match=(block, hit)) # Stay put while hits are on the shown page
+
+    def find_next():
+        # Continue after the highlighted hit, or from the top of the page after paging away
+        find_command(*(state["match"] or (state["page"], -1)))
+
+    time_entry.bind("<Return>", seek_time)
+    ttk.Button(seek_bar, text="Go", command=seek_time, width=6).pack(side=tk.LEFT, padx=2)
+    ttk.Button(seek_bar, text="First", command=find_command, width=6).pack(side=tk.LEFT, padx=2)
+    ttk.Button(seek_bar, text="Next", command=find_next, width=6).pack(side=tk.LEFT, padx=2)
+
+    page_bar = ttk.Frame(window, padding="5", style="TFrame")
+    page_bar.pack(fill=tk.X)
+    ttk.Button(page_bar, text="<< Start", command=lambda: show_page(0), width=10).pack(side=tk.LEFT, padx=2)
+    ttk.Button(page_bar, text="< Older", command=lambda: show_page(state["page"] - JOURNAL_VIEW_BLOCKS), width=10).pack(side=tk.LEFT, padx=2)
+    ttk.Button(page_bar, text="Newer >", command=lambda: show_page(state["page"] + JOURNAL_VIEW_BLOCKS), width=10).pack(side=tk.LEFT, padx=2)
+    ttk.Button(page_bar, text="End >>", command=lambda: show_page(len(reader.blocks) - JOURNAL_VIEW_BLOCKS), width=10).pack(side=tk.LEFT, padx=2)
+    show_page(len(reader.blocks) - JOURNAL_VIEW_BLOCKS) # Most recent output first
+
+
+# --- Wireless Discovery (mDNS) ---
+# Android 11+ wireless debugging advertises _adb-tls-pairing._tcp (while the
+# "Pair with code" dialog is open) and _adb-tls-connect._tcp. Services come from
+# `adb mdns services` and from a one-shot mDNS query sent from an ephemeral port,
+# which responders answer by unicast (RFC 6762 "legacy unicast"), so nothing has
+# to bind UDP 5353. Pairing and connecting then run in parallel for every device.
+ADB_MDNS_SERVICES = {"_adb-tls-connect._tcp.local": "connect", "_adb-tls-pairing._tcp.local": "pairing"}
+MDNS_DEFAULT_ADDRESS = ("224.0.0.251", 5353)
+
+def _mdns_address_from_env():
+    """ADB_HELPER_MDNS_ADDRESS=host:port points discovery at a stand-in responder."""
+    value = os.environ.get("ADB_HELPER_MDNS_ADDRESS", "")
+    if not value:
+        return MDNS_DEFAULT_ADDRESS
+    host, _, port = value.rpartition(":")
+    if host and port.isdigit() and 0 < int(port) < 65536:
+        return host, int(port)
+    print(f"Ignoring invalid ADB_HELPER_MDNS_ADDRESS '{value}' (expected host:port).")
+    return MDNS_DEFAULT_ADDRESS
+
+MDNS_ADDRESS = _mdns_address_from_env()
+MDNS_QUERY_TIMEOUT = 2.0 # Seconds to collect answers
+WIRELESS_WORKERS = 16 # Parallel adb pair/connect processes
+MDNS_CACHE_FILE = os.path.join(APP_DATA_DIR, "mdns_cache.json")
+DNS_TYPE_A, DNS_TYPE_PTR, DNS_TYPE_SRV = 1, 12, 33
+ADB_MDNS_LINE_RE = re.compile(r"^(\S+)\s+(_adb-tls-(?:connect|pairing)\._tcp)\.?\s+([\d.]+):(\d+)")
+mdns_cache_lock = threading.Lock()
+
+def _dns_encode_name(name):
+    return b"".join(bytes([len(label)]) + label for label in (part.encode("utf-8") for part in name.split(".") if part)) + b"\0"
+
+def _dns_read_name(data, offset):
+    """Returns (name, offset after the name), following compression pointers."""
+    labels, end, hops = [], None, 0
+    while True:
+        length = data[offset]
+        if length & 0xC0 == 0xC0:
+            if end is None:
+                end = offset + 2
+            offset = ((length & 0x3F) << 8) | data[offset + 1]
+            hops += 1
+            if hops > 32:
+                raise ValueError("DNS name compression loop")
+            continue
+        offset += 1
+        if length == 0:
+            return ".".join(labels), end if end is not None else offset
+        labels.append(data[offset:offset + length].decode("utf-8", "replace"))
+        offset += length
+
+def build_mdns_query(questions):
+    """questions: [(name, qtype)]. Sets the unicast-response bit on each question."""
+    packet = struct.pack(">HHHHHH", 0, 0, len(questions), 0, 0, 0)
+    for name, qtype in questions:
+        packet += _dns_encode_name(name) + struct.pack(">HH", qtype, 0x8001)
+    return packet
+
+def parse_mdns_packet(data):
+    """Returns [(lowercase name, type, value)] for the PTR, SRV and A records in a response."""
+    _, flags, questions, *counts = struct.unpack_from(">HHHHHH", data)
+    if not flags & 0x8000:
+        return [] # A query, not a response
+    offset, records = 12, []
+    for _ in range(questions):
+        offset = _dns_read_name(data, offset)[1] + 4
+    for _ in range(sum(counts)):
+        name, offset = _dns_read_name(data, offset)
+        rtype, _, _, length = struct.unpack_from(">HHIH", data, offset)
+        offset += 10
+        if rtype == DNS_TYPE_PTR:
+            records.append((name.lower(), rtype, _dns_read_name(data, offset)[0]))
+        elif rtype == DNS_TYPE_SRV:
+            port = struct.unpack_from(">H", data, offset + 4)[0]
+            records.append((name.lower(), rtype, (_dns_read_name(data, offset + 6)[0], port)))
+        elif rtype == DNS_TYPE_A and length == 4:
+            records.append((name.lower(), rtype, socket.inet_ntoa(data[offset:offset + 4])))
+        offset += length
+    return records
+
+def mdns_browse(timeout=MDNS_QUERY_TIMEOUT):
+    """Queries for adb services. Returns [{"name", "type", "address", "port"}]."""
+    instances, targets, addresses = {}, {}, {} # instance -> kind, instance -> (host, port), host -> ip
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    try:
+        sock.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_TTL, 255)
+        sock.bind(("", 0))
+
+        def collect(questions, seconds):
+            sock.sendto(build_mdns_query(questions), MDNS_ADDRESS)
+            deadline = time.monotonic() + seconds
+            while (remaining := deadline - time.monotonic()) > 0:
+                sock.settimeout(remaining)
+                try:
+                    data, _ = sock.recvfrom(9000)
+                    records = parse_mdns_packet(data)
+                except socket.timeout:
+                    break
+                except (ValueError, IndexError, struct.error):
+                    continue # Malformed packet from some other responder
+                for name, rtype, value in records:
+                    if rtype == DNS_TYPE_PTR and name in ADB_MDNS_SERVICES:
+                        instances[value] = ADB_MDNS_SERVICES[name]
+                    elif rtype == DNS_TYPE_SRV:
+                        targets[name] = value
+                    elif rtype == DNS_TYPE_A:
+                        addresses[name] = value
+
+        collect([(service, DNS_TYPE_PTR) for service in ADB_MDNS_SERVICES], timeout)
+        # Responders usually include SRV/A as additional records; ask for whatever is still missing
+        for _ in range(2): # SRV answers can name hosts whose A record needs one more round
+            missing = [(instance, DNS_TYPE_SRV) for instance in instances if instance.lower() not in targets]
+            missing += [(host, DNS_TYPE_A) for host in {h for h, _ in targets.values()} if host.lower() not in addresses]
+            if not missing:
+                break
+            collect(missing, timeout / 2)
+    finally:
+        sock.close()
+
+    services = []
+    for instance, kind in instances.items():
+        host, port = targets.get(instance.lower(), (None, None))
+        address = addresses.get((host or "").lower())
+        if address:
+            services.append({"name": instance.split("._adb-tls-")[0], "type": kind, "address": address, "port": port})
+    return services
+
+def parse_adb_mdns_services(output):
+    """Parses `adb mdns services` output into the same dicts as mdns_browse()."""
+    services = []
+    for line in output.splitlines():
+        match = ADB_MDNS_LINE_RE.match(line.strip())
+        if match:
+            name, service, address, port = match.groups()
+            services.append({"name": name, "type": ADB_MDNS_SERVICES[service + ".local"], "address": address, "port": int(port)})
+    return services
+
+def discover_wireless_devices(timeout=MDNS_QUERY_TIMEOUT):
+    """Runs the adb server's mDNS list and the built-in query in parallel and merges the results."""
+    with concurrent.futures.ThreadPoolExecutor(max_workers=2) as pool:
+        from_adb = pool.submit(run_adb_command, ["mdns", "services"], False, "mDNS Services", True)
+        from_query = pool.submit(mdns_browse, timeout)
+        merged = {}
+        try:
+            for service in from_query.result():
+                merged[(service["type"], service["address"], service["port"])] = service
+        except OSError as e:
+            log_message(f"[WARN] mDNS query failed ({e}); using adb's own discovery only.", WARN_COLOR)
+        stdout, _, returncode = from_adb.result() or ("", "", -1)
+        if returncode == 0:
+            for service in parse_adb_mdns_services(stdout):
+                merged.setdefault((service["type"], service["address"], service["port"]), service)
+    return sorted(merged.values(), key=lambda s: (s["address"], s["type"]))
+
+def local_subnet():
+    """The /24 of the interface that reaches the mDNS address (the cache key)."""
+    probe = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    try:
+        probe.connect(MDNS_ADDRESS) # No packet is sent; this only picks a route
+        return str(ipaddress.ip_network(f"{probe.getsockname()[0]}/24", strict=False))
+    except OSError:
+        return "unknown"
+    finally:
+        probe.close()
+
+def load_mdns_cache(subnet):
+    """Returns the services cached for a subnet from earlier scans."""
+    try:
+        with open(MDNS_CACHE_FILE, encoding="utf-8") as f:
+            return json.load(f).get(subnet, {}).get("services", [])
+    except (OSError, ValueError):
+        return []
+
+def save_mdns_cache(subnet, services):
+    """Merges services into the subnet's cache entry, keyed by service type and instance name."""
+    with mdns_cache_lock:
+        try:
+            with open(MDNS_CACHE_FILE, encoding="utf-8") as f:
+                cache = json.load(f)
+        except (OSError, ValueError):
+            cache = {}
+        known = {(s["type"], s["name"]): s for s in cache.get(subnet, {}).get("services", [])}
+        # Pair/connect status only describes this run; a reopened window would show it as current
+        known.update({(s["type"], s["name"]): {k: v for k, v in s.items() if k != "status"} for s in services})
+        cache[subnet] = {"updated": time.strftime("%Y-%m-%d %H:%M:%S"), "services": list(known.values())}
+        try:
+            os.makedirs(APP_DATA_DIR, exist_ok=True)
+            with open(MDNS_CACHE_FILE, "w", encoding="utf-8") as f:
+                json.dump(cache, f, indent=1)
+        except OSError as e:
+            log_message(f"[WARN] Could not save mDNS cache: {e}", WARN_COLOR)
+
+def pair_and_connect(services, codes, on_status=None):
+    """
+    Pairs every pairing service that has a code in `codes` ({address: code}),
+    then connects every connect service, all in parallel.
+    on_status(service, status) is called as each one finishes. Returns the number connected.
+    """
+    def report(service, status):
+        service["status"] = status
+        if on_status: on_status(service, status)
+
+    def pair(service):
+        target = f"{service['address']}:{service['port']}"
+        stdout, stderr, _ = run_adb_command(["pair", target, codes[service["address"]]], display_output=False,
+                                            command_name=f"Pair {target}", sync=True)
+        report(service, "paired" if "Successfully paired" in stdout else f"pair failed: {(stderr or stdout)[:60]}")
+
+    def connect(service):
+        target = f"{service['address']}:{service['port']}"
+        stdout, stderr, _ = run_adb_command(["connect", target], display_output=False, command_name=f"Connect {target}", sync=True)
+        ok = "connected to" in stdout and "failed" not in stdout
+        report(service, "connected" if ok else f"connect failed: {(stderr or stdout)[:60]}")
+        return ok
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=WIRELESS_WORKERS) as pool:
+        list(pool.map(pair, [s for s in services if s["type"] == "pairing" and codes.get(s["address"])]))
+        return sum(pool.map(connect, [s for s in services if s["type"] == "connect"]))
+
+def open_wireless_discovery():
+    """Lists wireless-debugging devices found over mDNS and pairs/connects them in one go."""
+    window = tk.Toplevel(root)
+    window.title("Wireless Devices")
+    window.geometry("820x520")
+    window.config(bg=DEFAULT_BACKGROUND_COLOR)
+
+    subnet = local_subnet()
+    columns = ("name", "type", "address", "port", "code", "status")
+    tree = ttk.Treeview(window, columns=columns, show="headings", selectmode="extended")
+    for column, title, width in (("name", "Name", 230), ("type", "Service", 70), ("address", "Address", 120),
+                                 ("port", "Port", 60), ("code", "Code", 70), ("status", "Status", 230)):
+        tree.heading(column, text=title)
+        tree.column(column, width=width, anchor="w")
+    tree.pack(expand=True, fill=tk.BOTH, padx=5, pady=5)
+    status_var = tk.StringVar()
+    ttk.Label(window, textvariable=status_var).pack(fill=tk.X, padx=5)
+
+    services = {} # tree item -> service dict
+    codes = {} # device address -> pairing code
+
+    def show(found, note):
+        tree.delete(*tree.get_children())
+        services.clear()
+        for service in found:
+            item = tree.insert("", tk.END, values=(service["name"], service["type"], service["address"], service["port"],
+                                                   codes.get(service["address"], ""), service.get("status", note)))
+            services[item] = service
+
+    def update_status(service, status):
+        def apply():
+            if not window.winfo_exists(): return
+            for item, known in services.items():
+                if known is service:
+                    tree.set(item, "status", status)
+        root.after(0, apply)
+
+    def scan():
+        status_var.set(f"Scanning {subnet}...")
+        def work():
+            started = time.monotonic()
+            found = discover_wireless_devices()
+            save_mdns_cache(subnet, found)
+            elapsed = time.monotonic() - started
+            def apply():
+                if not window.winfo_exists(): return
+                show(found, "found")
+                pairing = sum(s["type"] == "pairing" for s in found)
+                status_var.set(f"{len(found)} service(s) on {subnet} in {elapsed:.1f}s ({pairing} waiting to pair)")
+            root.after(0, apply)
+        command_scheduler.submit(work, PRIORITY_NORMAL, label="mDNS scan") # Multi-second; keep the interactive lane free
+
+    def set_code(event=None):
+        code = code_entry.get().strip()
+        selected = tree.selection() or tuple(item for item, s in services.items() if s["type"] == "pairing")
+        for item in selected:
+            service = services[item]
+            if service["type"] == "pairing":
+                codes[service["address"]] = code
+                tree.set(item, "code", code)
+
+    def run_all():
+        if not services:
+            log_message("[WARN] Nothing to connect. Scan first.", WARN_COLOR)
+            return
+        batch = list(services.values())
+        status_var.set(f"Pairing/connecting {len(batch)} service(s)...")
+        def work():
+            started = time.monotonic()
+            connected = pair_and_connect(batch, dict(codes), on_status=update_status)
+            save_mdns_cache(subnet, batch)
+            elapsed = time.monotonic() - started
+            log_message(f"[ OK ] Wireless: {connected} device(s) connected in {elapsed:.1f}s.", OK_COLOR)
+            root.after(0, lambda: window.winfo_exists() and status_var.set(f"{connected} connected in {elapsed:.1f}s"))
+        command_scheduler.submit(work, PRIORITY_NORMAL, label="Pair & connect wireless devices")
+
+    def use_selected(event=None):
+        selection = tree.selection()
+        if selection and services[selection[0]]["type"] == "connect":
+            service = services[selection[0]]
+            ip_entry.delete(0, tk.END)
+            ip_entry.insert(0, f"{service['address']}:{service['port']}") # Ready for the Connect button
+
+    tree.bind("<Double-1>", use_selected)
+    button_bar = ttk.Frame(window, padding="5", style="TFrame")
+    button_bar.pack(fill=tk.X)
+    ttk.Button(button_bar, text="Scan", command=scan, width=10).pack(side=tk.LEFT, padx=2)
+    ttk.Label(button_bar, text="Pairing code").pack(side=tk.LEFT, padx=(10, 2))
+    code_entry = ttk.Entry(button_bar, width=10)
+    code_entry.pack(side=tk.LEFT)
+    code_entry.bind("<Return>", set_code)
+    ttk.Button(button_bar, text="Set Code", command=set_code, width=10).pack(side=tk.LEFT, padx=2)
+    ttk.Button(button_bar, text="Pair && Connect All", command=run_all, width=20).pack(side=tk.LEFT, padx=2)
+
+    cached = load_mdns_cache(subnet)
+    if cached:
+        show(cached, "cached")
+        status_var.set(f"{len(cached)} cached service(s) for {subnet}; Scan to refresh")
+    scan()
+
+
 # --- GUI Setup ---
 root = tk.Tk()
 root.title(WINDOW_TITLE)
@@ -860,7 +4365,12 @@ buttons = [
     ("Install APK", install_apk), ("Uninstall APK", uninstall_apk), ("Clear Data", clear_app_data), ("Force Stop", force_stop_app),
     # Row 6: App Management / Logcat / Misc Info
     ("Disable App", lambda: toggle_app(False)), ("Enable App", lambda: toggle_app(True)), ("Start Logcat", start_logcat),
-    ("Stop Logcat", stop_logcat), ("Get IP Addr", get_device_ip), ("List Features", list_device_features), ("Get Mfr", get_manufacturer) # <<<--- FILLED SLOTS
+    ("Stop Logcat", stop_logcat), ("Get IP Addr", get_device_ip), ("List Features", list_device_features), ("Get Mfr", get_manufacturer), # <<<--- FILLED SLOTS
+    # Row 7: Tools
+    ("File Browser", open_file_browser), ("Reboot Manager", open_reboot_manager), ("Job Queue", open_job_queue),
+    ("Log Viewer", open_log_viewer), ("Crash Report", open_crash_report), ("Port Forwards", open_port_manager),
+    ("Screen Record", open_screen_recorder), ("Scan APKs", scan_apk_folder),
+    ("Processes", open_process_viewer), ("Journal", open_journal_viewer), ("Wireless Scan", open_wireless_discovery),
 ]
 
 r, c = 0, 0
@@ -905,7 +4415,11 @@ output_text.pack(expand=True, fill=tk.BOTH)
 # --- Initial Actions ---
 def initialize_app():
     global adb_executable_path
+    start_session_journal()
     adb_found = find_adb_path()
+    _load_kept_port_rules()
+    if any(kept_port_rules.values()):
+        start_port_rule_watcher() # Keep restoring saved forwards/reverses from earlier sessions
 
     # Disable all command buttons initially if ADB not found
     if not adb_found:
@@ -932,6 +4446,12 @@ root.after(100, initialize_app)
 # --- Graceful Shutdown ---
 def on_closing():
     global logcat_process, is_stopping_logcat
+    if active_recorders:
+        log_message("[INFO] Stopping screen recordings before exit...", INFO_COLOR)
+        recorders = list(active_recorders.values())
+        stop_recording()
+        for recorder in recorders:
+            recorder.thread.join(timeout=5) # Let segments flush to disk
     if logcat_process and logcat_process.poll() is None:
         log_message("[INFO] Stopping active Logcat before exit...", INFO_COLOR)
         is_stopping_logcat = True # Set flag
@@ -942,6 +4462,8 @@ def on_closing():
             proc_to_stop.wait(timeout=0.5) # Brief wait
         except Exception:
             pass # Ignore errors on close
+    if session_journal:
+        session_journal.close() # Write the last partial block
     # Ensure GUI closes even if logcat stop fails
     try:
         root.destroy()
@@ -951,4 +4473,5 @@ def on_closing():
 root.protocol("WM_DELETE_WINDOW", on_closing)
 
 # --- Start GUI ---
-root.mainloop()
\ No newline at end of file
+if __name__ == "__main__": # Lets benchmarks/run_benchmarks.py import the module without blocking
+    root.mainloop()
\ No newline at end of file
@@ -0,0 +1,199 @@
+"""
+Fake adb server for benchmarks and manual testing.
+
+Speaks the adb "smart socket" protocol on a local port so the GUI's
+server-protocol features (device list, track-devices, sync LIST/STAT/RECV/SEND,
+shell:/exec: services) can be exercised without a real device. Latency and
+output volume are controllable.
+
+Run standalone:  python fake_adb_server.py --port 5038 --devices 4
+Then start the GUI with ANDROID_ADB_SERVER_PORT=5038.
+"""
+import argparse
+import socket
+import socketserver
+import stat
+import struct
+import threading
+import time
+
+SYNC_DATA_MAX = 64 * 1024
+
+
+class FakeAdbServer(socketserver.ThreadingTCPServer):
+    """
+    Threaded fake adb server.
+
+    latency: seconds added before answering every request/sync command.
+    devices: serials reported as connected.
+    dir_entries: number of files listed in every directory.
+    file_size: bytes returned for every pulled file.
+    shell_lines / line_bytes: output volume of shell:/exec: services.
+    """
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, port=0, latency=0.0, devices=("emulator-5554",), dir_entries=100,
+                 file_size=64 * 1024, shell_lines=10, line_bytes=80):
+        super().__init__(("127.0.0.1", port), _FakeAdbHandler)
+        self.latency = latency
+        self.devices = list(devices)
+        self.dir_entries = dir_entries
+        self.file_size = file_size
+        self.shell_lines = shell_lines
+        self.line_bytes = line_bytes
+        self.request_count = 0
+        self.count_lock = threading.Lock()
+
+    @property
+    def port(self):
+        return self.server_address[1]
+
+    def start(self):
+        """Serves on a background thread. Returns self for chaining."""
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+    def delay(self):
+        with self.count_lock:
+            self.request_count += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+    def shell_output(self, command):
+        """Output of a shell:/exec: command. Override for custom behaviour."""
+        if command.startswith("echo "):
+            return command[5:].encode() + b"\n"
+        if command.startswith("getprop"):
+            return b"1\n"
+        line = b"x" * max(self.line_bytes - 1, 0) + b"\n"
+        return line * self.shell_lines
+
+
+class _FakeAdbHandler(socketserver.BaseRequestHandler):
+
+    def recv_exact(self, size):
+        data = bytearray()
+        while len(data) < size:
+            chunk = self.request.recv(size - len(data))
+            if not chunk:
+                raise EOFError
+            data.extend(chunk)
+        return bytes(data)
+
+    def okay(self):
+        self.request.sendall(b"OKAY")
+
+    def fail(self, message):
+        payload = message.encode()
+        self.request.sendall(b"FAIL" + f"{len(payload):04x}".encode() + payload)
+
+    def send_payload(self, text):
+        payload = text.encode()
+        self.request.sendall(f"{len(payload):04x}".encode() + payload)
+
+    def handle(self):
+        server = self.server
+        serial = None
+        try:
+            while True:
+                length = int(self.recv_exact(4), 16)
+                service = self.recv_exact(length).decode()
+                server.delay()
+                if service.startswith("host-serial:"):
+                    _, serial, rest = service.split(":", 2)
+                    service = "host:" + rest
+                if service == "host:version":
+                    self.okay()
+                    return self.send_payload("0029")
+                if service == "host:devices":
+                    self.okay()
+                    return self.send_payload("".join(f"{s}\tdevice\n" for s in server.devices))
+                if service == "host:track-devices":
+                    self.okay()
+                    self.send_payload("".join(f"{s}\tdevice\n" for s in server.devices))
+                    while self.request.recv(1):
+                        pass # Hold the stream open until the client goes away
+                    return
+                if service.startswith("host:transport"):
+                    serial = service.split(":", 2)[2] if service.startswith("host:transport:") else server.devices[0]
+                    if serial not in server.devices:
+                        return self.fail(f"device '{serial}' not found")
+                    self.okay()
+                    continue
+                if serial is None:
+                    return self.fail(f"unknown host service: {service}")
+                self.okay()
+                if service == "sync:":
+                    return self.handle_sync()
+                if service.startswith(("shell:", "exec:")):
+                    self.request.sendall(server.shell_output(service.split(":", 1)[1]))
+                    return
+                return # reboot:, tcpip:, etc. just close
+        except (EOFError, ConnectionError):
+            pass
+
+    def handle_sync(self):
+        server = self.server
+        while True:
+            header = self.recv_exact(8)
+            sync_id, length = header[:4], struct.unpack("<I", header[4:])[0]
+            if sync_id == b"QUIT":
+                return
+            path = self.recv_exact(length).decode()
+            server.delay()
+            if sync_id == b"LIST":
+                out = bytearray()
+                for i in range(server.dir_entries):
+                    name = f"file_{i:06d}.bin".encode()
+                    out += b"DENT" + struct.pack("<IIII", stat.S_IFREG | 0o644, server.file_size, 1700000000, len(name)) + name
+                    if len(out) > SYNC_DATA_MAX:
+                        self.request.sendall(out)
+                        out = bytearray()
+                self.request.sendall(bytes(out) + b"DONE" + b"\0" * 16)
+            elif sync_id == b"STAT":
+                self.request.sendall(b"STAT" + struct.pack("<III", stat.S_IFDIR | 0o755, 4096, 1700000000))
+            elif sync_id == b"RECV":
+                remaining = server.file_size
+                chunk = b"\0" * SYNC_DATA_MAX
+                while remaining:
+                    size = min(remaining, SYNC_DATA_MAX)
+                    self.request.sendall(b"DATA" + struct.pack("<I", size) + chunk[:size])
+                    remaining -= size
+                self.request.sendall(b"DONE" + b"\0" * 4)
+            elif sync_id == b"SEND":
+                while True:
+                    header = self.recv_exact(8)
+                    if header[:4] == b"DONE":
+                        break
+                    self.recv_exact(struct.unpack("<I", header[4:])[0])
+                self.request.sendall(b"OKAY" + b"\0" * 4)
+            else:
+                message = f"unknown sync command {sync_id!r}".encode()
+                self.request.sendall(b"FAIL" + struct.pack("<I", len(message)) + message)
+                return
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fake adb server for benchmarks.")
+    parser.add_argument("--port", type=int, default=5038)
+    parser.add_argument("--devices", type=int, default=1, help="Number of fake devices")
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--dir-entries", type=int, default=100)
+    parser.add_argument("--file-size", type=int, default=64 * 1024)
+    args = parser.parse_args()
+    server = FakeAdbServer(args.port, args.latency_ms / 1000, [f"emulator-{5554 + 2 * i}" for i in range(args.devices)],
+                           args.dir_entries, args.file_size)
+    print(f"Fake adb server listening on 127.0.0.1:{server.port} with {args.devices} device(s). Ctrl+C to stop.")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
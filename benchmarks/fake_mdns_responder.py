@@ -0,0 +1,132 @@
+"""
+Fake mDNS responder for wireless-debugging discovery.
+
+Answers queries for _adb-tls-connect._tcp / _adb-tls-pairing._tcp the way an
+Android 11+ device with wireless debugging enabled does (PTR answers with SRV
+and A additional records), for any number of fake devices. Replies go back to
+the querying address, as mDNS does for queries sent from a port other than 5353.
+
+Fake device N is at 127.0.0.(N + 10), so every device has its own address
+(Linux routes all of 127.0.0.0/8 to loopback).
+
+Run standalone:  python fake_mdns_responder.py --port 5354 --devices 30
+Then start the GUI with ADB_HELPER_MDNS_ADDRESS=127.0.0.1:5354.
+"""
+import argparse
+import socket
+import socketserver
+import struct
+import threading
+
+CONNECT_SERVICE = "_adb-tls-connect._tcp.local"
+PAIRING_SERVICE = "_adb-tls-pairing._tcp.local"
+TYPE_A, TYPE_PTR, TYPE_SRV = 1, 12, 33
+
+
+def encode_name(name):
+    return b"".join(bytes([len(label)]) + label for label in (part.encode() for part in name.split(".") if part)) + b"\0"
+
+def read_name(data, offset):
+    labels = []
+    while data[offset]:
+        length = data[offset]
+        labels.append(data[offset + 1:offset + 1 + length].decode())
+        offset += 1 + length
+    return ".".join(labels), offset + 1
+
+def record(name, rtype, rdata, ttl=120):
+    return encode_name(name) + struct.pack(">HHIH", rtype, 0x8001, ttl, len(rdata)) + rdata
+
+
+class FakeMdnsResponder(socketserver.ThreadingUDPServer):
+    """
+    devices: number of fake devices advertising a connect service.
+    pairing: how many of them also advertise a pairing service.
+    """
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, port=0, devices=30, pairing=None):
+        super().__init__(("127.0.0.1", port), _FakeMdnsHandler)
+        self.devices = [
+            {"name": f"adb-FAKE{i:04d}-{i * 7919 % 65536:04x}", "host": f"Android-{i}.local",
+             "address": f"127.0.0.{i + 10}", "connect_port": 37000 + i, "pairing_port": 41000 + i}
+            for i in range(devices)
+        ]
+        self.pairing = devices if pairing is None else pairing
+        self.thread = None
+
+    @property
+    def port(self):
+        return self.server_address[1]
+
+    def start(self):
+        self.thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+    def answers(self, name, qtype):
+        """Yields (answer records, additional records) for one question."""
+        for index, device in enumerate(self.devices):
+            services = [(CONNECT_SERVICE, device["connect_port"])]
+            if index < self.pairing:
+                services.append((PAIRING_SERVICE, device["pairing_port"]))
+            a_record = record(device["host"], TYPE_A, socket.inet_aton(device["address"]))
+            for service, port in services:
+                instance = f"{device['name']}.{service}"
+                srv_record = record(instance, TYPE_SRV, struct.pack(">HHH", 0, 0, port) + encode_name(device["host"]))
+                if qtype == TYPE_PTR and name == service:
+                    yield record(service, TYPE_PTR, encode_name(instance)), [srv_record, a_record]
+                elif qtype == TYPE_SRV and name == instance.lower():
+                    yield srv_record, [a_record]
+            if qtype == TYPE_A and name == device["host"].lower():
+                yield a_record, []
+
+
+class _FakeMdnsHandler(socketserver.BaseRequestHandler):
+    def handle(self):
+        data, sock = self.request
+        questions = struct.unpack_from(">H", data, 4)[0]
+        offset, results = 12, []
+        for _ in range(questions):
+            name, offset = read_name(data, offset)
+            qtype = struct.unpack_from(">H", data, offset)[0]
+            offset += 4
+            results.extend(self.server.answers(name.lower(), qtype))
+        # Pack answers (each with its additional records) into packets under the 9000-byte mDNS limit
+        answers, additional = [], []
+        for answer, extra in results:
+            size = 12 + sum(map(len, answers + additional + extra)) + len(answer)
+            if answers and size > 8000:
+                self.send(sock, answers, additional)
+                answers, additional = [], []
+            answers.append(answer)
+            additional.extend(r for r in extra if r not in additional)
+        if answers:
+            self.send(sock, answers, additional)
+
+    def send(self, sock, answers, additional):
+        header = struct.pack(">HHHHHH", 0, 0x8400, 0, len(answers), 0, len(additional))
+        sock.sendto(header + b"".join(answers) + b"".join(additional), self.client_address)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fake mDNS responder for adb wireless discovery.")
+    parser.add_argument("--port", type=int, default=5354)
+    parser.add_argument("--devices", type=int, default=30)
+    parser.add_argument("--pairing", type=int, default=None, help="Devices also advertising a pairing service (default: all)")
+    args = parser.parse_args()
+    server = FakeMdnsResponder(args.port, args.devices, args.pairing)
+    print(f"Fake mDNS responder on 127.0.0.1:{server.port} with {args.devices} device(s). Ctrl+C to stop.")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,294 @@
+"""
+Benchmarks for the Adb Helper command core.
+
+Loads "Adb Helper (GUI).py" without entering its main loop, points it at
+the stub adb binary (stub_adb.py) and the fake adb server
+(fake_adb_server.py), and measures the tool's own overhead:
+
+  * run_adb_command sync and async throughput
+  * log_message insert rate into output_text (direct flood and streamed logcat)
+  * screenshot pipeline latency
+  * multi-device fan-out scaling (sync LIST and scheduled shell commands)
+  * wireless discovery and parallel pair/connect (fake_mdns_responder.py)
+
+Usage:
+    python benchmarks/run_benchmarks.py                  # run and compare with baseline.json
+    python benchmarks/run_benchmarks.py --save-baseline  # run and store results as the new baseline
+    python benchmarks/run_benchmarks.py --only log       # run benchmarks whose name contains "log"
+
+Needs a display (the output widget is a real Tk Text widget).
+"""
+import argparse
+import importlib.util
+import json
+import os
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+GUI_SCRIPT = os.path.join(os.path.dirname(BENCH_DIR), "Adb Helper (GUI).py")
+BASELINE_FILE = os.path.join(BENCH_DIR, "baseline.json")
+REGRESSION_THRESHOLD = 0.20 # 20% worse than baseline is flagged
+
+sys.path.insert(0, BENCH_DIR)
+from fake_adb_server import FakeAdbServer # noqa: E402
+from fake_mdns_responder import FakeMdnsResponder # noqa: E402
+
+
+# --- Setup ---
+def make_stub_launcher(work_dir):
+    """Writes an `adb` launcher that runs stub_adb.py with this interpreter. Returns its path."""
+    stub = os.path.join(BENCH_DIR, "stub_adb.py")
+    if sys.platform == "win32":
+        launcher = os.path.join(work_dir, "adb.cmd")
+        with open(launcher, "w") as f:
+            f.write(f'@"{sys.executable}" "{stub}" %*\n')
+    else:
+        launcher = os.path.join(work_dir, "adb")
+        with open(launcher, "w") as f:
+            f.write(f'#!/bin/sh\nexec "{sys.executable}" "{stub}" "$@"\n')
+        os.chmod(launcher, 0o755)
+    return launcher
+
+def load_gui(adb_path, server_port, data_dir):
+    """Imports the GUI script as a module (its main loop only runs under __main__)."""
+    os.environ["ANDROID_ADB_SERVER_PORT"] = str(server_port)
+    os.environ["ADB_HELPER_DATA_DIR"] = data_dir # Keep the journal, caches and port rules out of ~/.adb_helper
+    spec = importlib.util.spec_from_file_location("adb_helper_gui", GUI_SCRIPT)
+    gui = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(gui)
+
+    def use_stub():
+        gui.adb_executable_path = adb_path
+        return adb_path
+    gui.find_adb_path = use_stub # initialize_app() looks it up at call time
+    gui.adb_executable_path = adb_path
+    gui.root.withdraw()
+    pump(gui, lambda: False, timeout=0.3) # Let initialize_app run
+    return gui
+
+def pump(gui, done, timeout=60.0):
+    """Processes Tk events until done() is true. Returns False on timeout."""
+    deadline = time.perf_counter() + timeout
+    while not done():
+        if time.perf_counter() > deadline:
+            return False
+        gui.root.update()
+        time.sleep(0.0005)
+    gui.root.update()
+    return True
+
+def scheduler_idle(gui):
+    return not gui.command_scheduler.snapshot()
+
+def output_line_count(gui):
+    return int(gui.output_text.index("end-1c").split(".")[0])
+
+def clear(gui):
+    pump(gui, lambda: True)
+    gui.clear_output()
+
+
+# --- Benchmarks ---
+# Each returns {metric name: (value, unit, higher_is_better)}
+
+def bench_sync_throughput(gui, ctx, calls=40):
+    latencies = []
+    for i in range(calls):
+        started = time.perf_counter()
+        gui.run_adb_command(["shell", "echo", str(i)], sync=True, command_name="Bench")
+        latencies.append(time.perf_counter() - started)
+    clear(gui)
+    return {
+        "sync_calls_per_s": (calls / sum(latencies), "calls/s", True),
+        "sync_median_latency_ms": (statistics.median(latencies) * 1000, "ms", False),
+    }
+
+def bench_async_throughput(gui, ctx, calls=80):
+    started = time.perf_counter()
+    for i in range(calls):
+        gui.run_adb_command(["shell", "echo", str(i)], command_name="Bench")
+    pump(gui, lambda: scheduler_idle(gui))
+    elapsed = time.perf_counter() - started
+    clear(gui)
+    return {"async_calls_per_s": (calls / elapsed, "calls/s", True)}
+
+def bench_coalesced_reads(gui, ctx, calls=50):
+    """Identical read-only commands issued at once should cost about one adb process."""
+    gui.invalidate_command_cache()
+    started = time.perf_counter()
+    for _ in range(calls):
+        gui.run_adb_command(["shell", "getprop", "ro.product.model"], command_name="Bench")
+    pump(gui, lambda: scheduler_idle(gui))
+    elapsed = time.perf_counter() - started
+    clear(gui)
+    return {"coalesced_reads_per_s": (calls / elapsed, "calls/s", True)}
+
+def bench_log_flood(gui, ctx, lines=20000):
+    clear(gui)
+    target = output_line_count(gui) + lines
+    text = "I/ActivityManager( 1234): Start proc 4321:com.example/u0a123 for activity"
+    started = time.perf_counter()
+    for _ in range(lines):
+        gui.log_message(text, gui.TEXT_AREA_FG)
+    pump(gui, lambda: output_line_count(gui) >= target)
+    elapsed = time.perf_counter() - started
+    clear(gui)
+    return {"log_insert_lines_per_s": (lines / elapsed, "lines/s", True)}
+
+def bench_logcat_stream(gui, ctx, lines=20000):
+    """End to end: stub logcat -> reader thread -> log_message -> output_text."""
+    clear(gui)
+    os.environ["STUB_ADB_LOGCAT_LINES"] = str(lines)
+    started = time.perf_counter()
+    gui.start_logcat()
+    pump(gui, lambda: gui.logcat_process is not None, timeout=10)
+    pump(gui, lambda: gui.logcat_process is None, timeout=120)
+    elapsed = time.perf_counter() - started
+    clear(gui)
+    return {"logcat_stream_lines_per_s": (lines / elapsed, "lines/s", True)}
+
+def bench_screenshot(gui, ctx, runs=5):
+    latencies = []
+    for i in range(runs):
+        path = os.path.join(ctx["work_dir"], f"shot_{i}.png")
+        started = time.perf_counter()
+        gui._thread_take_screenshot(path)
+        latencies.append(time.perf_counter() - started)
+    clear(gui)
+    return {"screenshot_median_latency_ms": (statistics.median(latencies) * 1000, "ms", False)}
+
+def bench_fanout(gui, ctx, device_counts=(1, 2, 4, 8)):
+    """Per-device work run on N devices at once; ideal scaling keeps wall time flat."""
+    server = ctx["server"]
+    results = {}
+    for count in device_counts:
+        serials = server.devices[:count]
+
+        # Sync LIST of a large directory on every device in parallel
+        gui.file_browser_cache.clear()
+        threads = [threading.Thread(target=gui.list_device_dir, args=(s, "/sdcard/bench", False)) for s in serials]
+        started = time.perf_counter()
+        for t in threads: t.start()
+        for t in threads: t.join()
+        results[f"fanout_list_{count}dev_ms"] = ((time.perf_counter() - started) * 1000, "ms", False)
+
+        # Scheduled shell commands, several per device
+        started = time.perf_counter()
+        for s in serials:
+            for i in range(5):
+                gui.run_adb_command(["-s", s, "shell", "echo", str(i)], command_name="Bench")
+        pump(gui, lambda: scheduler_idle(gui))
+        results[f"fanout_shell_{count}dev_ms"] = ((time.perf_counter() - started) * 1000, "ms", False)
+        clear(gui)
+    return results
+
+def bench_wireless(gui, ctx, devices=30):
+    """One scan and one pair+connect pass for 30 wireless-debugging devices."""
+    responder = FakeMdnsResponder(devices=devices).start()
+    gui.MDNS_ADDRESS = ("127.0.0.1", responder.port)
+    try:
+        started = time.perf_counter()
+        services = gui.discover_wireless_devices(timeout=0.5)
+        scan_ms = (time.perf_counter() - started) * 1000
+        codes = {s["address"]: "123456" for s in services if s["type"] == "pairing"}
+        started = time.perf_counter()
+        connected = gui.pair_and_connect(services, codes)
+        connect_ms = (time.perf_counter() - started) * 1000
+    finally:
+        responder.stop()
+    if connected != devices:
+        print(f"  warning: {connected}/{devices} devices connected")
+    clear(gui)
+    return {
+        f"wireless_scan_{devices}dev_ms": (scan_ms, "ms", False),
+        f"wireless_pair_connect_{devices}dev_ms": (connect_ms, "ms", False),
+    }
+
+BENCHMARKS = [
+    ("sync_throughput", bench_sync_throughput),
+    ("async_throughput", bench_async_throughput),
+    ("coalesced_reads", bench_coalesced_reads),
+    ("log_flood", bench_log_flood),
+    ("logcat_stream", bench_logcat_stream),
+    ("screenshot", bench_screenshot),
+    ("fanout", bench_fanout),
+    ("wireless", bench_wireless),
+]
+
+
+# --- Baselines ---
+def compare(results, baseline):
+    """Prints each metric against the baseline. Returns the names of regressed metrics."""
+    regressions = []
+    print(f"\n{'Metric':36} {'Value':>14} {'Baseline':>14} {'Change':>9}")
+    for name, (value, unit, higher_is_better) in results.items():
+        base = baseline.get("results", {}).get(name)
+        if base is None:
+            print(f"{name:36} {value:>10.2f} {unit:<3} {'-':>14} {'new':>9}")
+            continue
+        change = (value - base["value"]) / base["value"] if base["value"] else 0.0
+        worse = -change if higher_is_better else change
+        flag = "  << REGRESSION" if worse > REGRESSION_THRESHOLD else ""
+        if flag: regressions.append(name)
+        print(f"{name:36} {value:>10.2f} {unit:<3} {base['value']:>10.2f} {unit:<3} {change:>+8.1%}{flag}")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the Adb Helper command core.")
+    parser.add_argument("--save-baseline", action="store_true", help="Store these results as the new baseline")
+    parser.add_argument("--baseline", default=BASELINE_FILE, help="Baseline JSON file")
+    parser.add_argument("--only", default="", help="Run only benchmarks whose name contains this text")
+    parser.add_argument("--latency-ms", type=float, default=5.0, help="Latency of the stub adb and fake server")
+    parser.add_argument("--fail-on-regression", action="store_true", help="Exit with code 1 if a metric regressed")
+    args = parser.parse_args()
+
+    work_dir = tempfile.mkdtemp(prefix="adb_helper_bench_")
+    os.environ["STUB_ADB_LATENCY_MS"] = str(args.latency_ms)
+    os.environ.setdefault("STUB_ADB_FILE_BYTES", str(1024 * 1024))
+    server = FakeAdbServer(latency=args.latency_ms / 1000, devices=[f"emulator-{5554 + 2 * i}" for i in range(8)],
+                           dir_entries=20000).start()
+    try:
+        gui = load_gui(make_stub_launcher(work_dir), server.port, os.path.join(work_dir, "data"))
+        ctx = {"work_dir": work_dir, "server": server}
+        results = {}
+        for name, bench in BENCHMARKS:
+            if args.only and args.only not in name:
+                continue
+            print(f"Running {name}...", flush=True)
+            results.update(bench(gui, ctx))
+        gui.root.destroy()
+    finally:
+        server.stop()
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+    regressions = compare(results, baseline)
+
+    if args.save_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump({
+                "recorded_at": time.strftime("%Y-%m-%d %H:%M:%S"),
+                "machine": f"{platform.system()} {platform.machine()} / Python {platform.python_version()}",
+                "stub_latency_ms": args.latency_ms,
+                "results": {name: {"value": round(value, 3), "unit": unit, "higher_is_better": hib}
+                            for name, (value, unit, hib) in results.items()},
+            }, f, indent=2)
+        print(f"\nBaseline saved to {args.baseline}")
+    if regressions:
+        print(f"\n{len(regressions)} metric(s) regressed more than {REGRESSION_THRESHOLD:.0%}: {', '.join(regressions)}")
+        if args.fail_on_regression:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,72 @@
+"""
+Stub `adb` command-line binary for benchmarks.
+
+Mimics the adb CLI closely enough for run_adb_command and the screenshot
+pipeline, with controllable latency and output volume via environment:
+
+    STUB_ADB_LATENCY_MS    delay before each command answers (default 0)
+    STUB_ADB_OUTPUT_LINES  lines printed by shell commands (default 10)
+    STUB_ADB_LINE_BYTES    bytes per output line (default 80)
+    STUB_ADB_LOGCAT_LINES  lines streamed by `logcat` before exiting (default 10000)
+    STUB_ADB_FILE_BYTES    size of files written by `pull` (default 1 MB)
+"""
+import os
+import sys
+import time
+
+
+def env_number(name, default):
+    return float(os.environ.get(name, default))
+
+
+def main(argv):
+    time.sleep(env_number("STUB_ADB_LATENCY_MS", 0) / 1000)
+    if len(argv) >= 2 and argv[0] == "-s":
+        argv = argv[2:]
+    if not argv:
+        print("Android Debug Bridge (stub)")
+        return 1
+    command, rest = argv[0], argv[1:]
+    out = sys.stdout
+    line = "x" * max(int(env_number("STUB_ADB_LINE_BYTES", 80)) - 1, 0) + "\n"
+
+    if command == "version":
+        out.write("Android Debug Bridge version 1.0.41 (stub)\n")
+    elif command == "devices":
+        out.write("List of devices attached\nemulator-5554\tdevice\n")
+    elif command == "get-serialno":
+        out.write("emulator-5554\n")
+    elif command == "logcat":
+        if rest and rest[-1] == "-d":
+            out.write(line * int(env_number("STUB_ADB_OUTPUT_LINES", 10)))
+        else:
+            for i in range(int(env_number("STUB_ADB_LOGCAT_LINES", 10000))):
+                out.write(f"I/Bench( {i % 32768}): logcat line {i}\n")
+    elif command == "pull" and len(rest) >= 2:
+        destination = rest[1]
+        if os.path.isdir(destination):
+            destination = os.path.join(destination, os.path.basename(rest[0]))
+        with open(destination, "wb") as pulled:
+            pulled.write(b"\0" * int(env_number("STUB_ADB_FILE_BYTES", 1024 * 1024)))
+        out.write(f"{rest[0]}: 1 file pulled.\n")
+    elif command == "push" and len(rest) >= 2:
+        out.write(f"{rest[0]}: 1 file pushed.\n")
+    elif command == "connect" and rest:
+        out.write(f"connected to {rest[0]}\n")
+    elif command == "pair" and len(rest) >= 2:
+        out.write(f"Successfully paired to {rest[0]} [guid=adb-stub]\n")
+    elif command == "mdns":
+        out.write("List of discovered mdns services\n") # Discovery comes from the fake responder
+    elif command == "shell":
+        if rest and rest[0] == "echo":
+            out.write(" ".join(rest[1:]) + "\n")
+        elif rest and rest[0] in ("screencap", "rm"):
+            pass # Silent on success, like the real commands
+        else:
+            out.write(line * int(env_number("STUB_ADB_OUTPUT_LINES", 10)))
+    out.flush()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))